@@ -0,0 +1,100 @@
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db.models import F, Q
+
+ASK_WEIGHT = 3
+ANSWER_WEIGHT = 2
+VOTE_WEIGHT = 1
+
+
+def question_tag_ids(question_id):
+    from .models import Question
+    return list(Question.tags.through.objects.filter(
+        question_id=question_id
+    ).values_list("tag_id", flat=True))
+
+
+def post_question_id(post):
+    '''Return the id of the question a post belongs to.'''
+    from .models import Answer
+    return post.question_id if isinstance(post, Answer) else post.id
+
+
+def adjust_affinity(deltas):
+    '''Apply {(profile_id, tag_id): delta} to the stored affinities,
+    creating missing rows first so that each distinct delta costs a
+    single UPDATE.'''
+    from .models import ProfileTagAffinity
+    deltas = {
+        (profile_id, tag_id): delta
+        for (profile_id, tag_id), delta in deltas.items()
+        if delta and profile_id is not None
+    }
+    if not deltas:
+        return
+    ProfileTagAffinity.objects.bulk_create([
+        ProfileTagAffinity(profile_id=profile_id, tag_id=tag_id)
+        for profile_id, tag_id in deltas
+    ], ignore_conflicts=True)
+    grouped = defaultdict(lambda: defaultdict(list))
+    for (profile_id, tag_id), delta in deltas.items():
+        grouped[delta][profile_id].append(tag_id)
+    for delta, profiles in grouped.items():
+        condition = reduce(or_, (
+            Q(profile_id=profile_id, tag_id__in=tag_ids)
+            for profile_id, tag_ids in profiles.items()
+        ))
+        ProfileTagAffinity.objects.filter(condition).update(
+            weight=F("weight") + delta
+        )
+
+
+def adjust_profile_affinity(profile_id, tag_ids, delta):
+    adjust_affinity({(profile_id, tag_id): delta for tag_id in tag_ids})
+
+
+def adjust_vote_affinity(profile_id, post, delta):
+    adjust_profile_affinity(
+        profile_id, question_tag_ids(post_question_id(post)), delta
+    )
+
+
+def rebuild_affinity(batch_size=1000):
+    '''Recompute every affinity from the questions, answers and votes
+    on record and return the number of rows written.'''
+    from .models import ProfileTagAffinity, Question, Answer, Vote
+    taggings = defaultdict(list)
+    for question_id, tag_id in Question.tags.through.objects.values_list(
+        "question_id", "tag_id"
+    ):
+        taggings[question_id].append(tag_id)
+    weights = Counter()
+
+    def credit(profile_id, question_id, weight):
+        if profile_id is not None:
+            for tag_id in taggings.get(question_id, ()):
+                weights[profile_id, tag_id] += weight
+
+    for profile_id, question_id in Question.objects.values_list("profile_id", "id"):
+        credit(profile_id, question_id, ASK_WEIGHT)
+    for profile_id, question_id in Answer.objects.values_list(
+        "profile_id", "question_id"
+    ):
+        credit(profile_id, question_id, ANSWER_WEIGHT)
+    answer_questions = dict(Answer.objects.values_list("id", "question_id"))
+    for vote in Vote.objects.select_related("content_type"):
+        model = vote.content_type.model_class()
+        if model is Question:
+            credit(vote.profile_id, vote.object_id, VOTE_WEIGHT)
+        elif model is Answer:
+            question_id = answer_questions.get(vote.object_id)
+            credit(vote.profile_id, question_id, VOTE_WEIGHT)
+    affinities = [
+        ProfileTagAffinity(profile_id=profile_id, tag_id=tag_id, weight=weight)
+        for (profile_id, tag_id), weight in weights.items()
+    ]
+    ProfileTagAffinity.objects.all().delete()
+    ProfileTagAffinity.objects.bulk_create(affinities, batch_size)
+    return len(affinities)
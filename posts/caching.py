@@ -0,0 +1,108 @@
+from hashlib import md5
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.timesince import timesince
+
+LISTING_VERSION_KEY = "posts:listing_version"
+SCORE_VERSION_KEY = "posts:score_version"
+QUESTION_VERSION_KEY = "posts:question_version:{}"
+SEARCH_RESULTS_TIMEOUT = getattr(settings, "SEARCH_RESULTS_CACHE_TIMEOUT", 300)
+QUESTION_PAGE_TIMEOUT = getattr(settings, "QUESTION_PAGE_CACHE_TIMEOUT", 600)
+QUESTION_CARD_TIMEOUT = getattr(settings, "QUESTION_CARD_CACHE_TIMEOUT", 24 * 60 * 60)
+
+
+def _current_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so that an evicted counter never restarts
+        # at a number whose entries could still be cached.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_version(key):
+    '''Bump a version counter now and again once the current
+    transaction commits, so that a page cached from the pre-commit
+    state by another request cannot outlive the change.'''
+    _bump_version(key)
+    transaction.on_commit(lambda: _bump_version(key))
+
+
+def listing_version():
+    return _current_version(LISTING_VERSION_KEY)
+
+
+def bump_listing_version():
+    bump_version(LISTING_VERSION_KEY)
+
+
+def score_version():
+    return _current_version(SCORE_VERSION_KEY)
+
+
+def bump_score_version():
+    '''Expire the listings filtered on scores. Votes bump this rather
+    than the listing version, which would expire every cached search
+    and count on each vote.'''
+    bump_version(SCORE_VERSION_KEY)
+
+
+def question_version(question_id):
+    return _current_version(QUESTION_VERSION_KEY.format(question_id))
+
+
+def bump_question_version(question_id):
+    '''Expire everything cached from the question's page: its answers,
+    scores, tags and edits.'''
+    bump_version(QUESTION_VERSION_KEY.format(question_id))
+
+
+def question_page_key(question_id):
+    return f"posts:question_page:{question_id}:{question_version(question_id)}"
+
+
+def question_etag(question_id, *parts):
+    '''Fingerprint the question's current version together with the
+    parts a response about it also varies by, for use as its ETag.'''
+    return md5("|".join(map(str, (
+        question_id, question_version(question_id), *parts
+    ))).encode()).hexdigest()
+
+
+def question_card_key(question_id, show_body):
+    return f"posts:question_card:{int(show_body)}:{question_id}"
+
+
+def question_card_stamp(question):
+    '''Fingerprint everything a QuestionRow's listing card shows: a
+    card cached under a different stamp is out of date. The card shows
+    the question's age as timesince renders it, so the stamp changes
+    whenever that text does.'''
+    return md5("|".join(map(str, (
+        question.title, question.excerpt, question.live_score,
+        question.answer_count, question.views, question.author,
+        ",".join(question.tags), timesince(question.date)
+    ))).encode()).hexdigest()
+
+
+def search_results_key(query, tab):
+    '''Key the ids matching a search by the listing version and, for
+    searches filtered on score, by the score version. Scores also break
+    ties in the listing order; other searches pick up votes when their
+    entry times out.'''
+    digest = md5(f"{query}|{tab}".encode()).hexdigest()
+    version = listing_version()
+    if tab == "score" or query.score:
+        version = f"{version}.{score_version()}"
+    return f"posts:search:{version}:{digest}"
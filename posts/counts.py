@@ -0,0 +1,181 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import caching
+
+COUNT_CACHE_TIMEOUT = getattr(settings, "LISTING_COUNT_CACHE_TIMEOUT", 600)
+ESTIMATE_ABOVE = getattr(settings, "LISTING_COUNT_ESTIMATE_ABOVE", 10000)
+
+QUESTIONS = "questions"
+ANSWERED = "questions:answered"
+UNANSWERED = "questions:unanswered"
+TAB_COUNTERS = {
+    "newest": QUESTIONS,
+    "active": ANSWERED,
+    "unanswered": UNANSWERED,
+}
+
+
+class ResultCount(int):
+    '''An integer count that remembers whether it was estimated.'''
+
+    def __new__(cls, value, estimated=False):
+        count = super().__new__(cls, value)
+        count.estimated = estimated
+        return count
+
+
+def tag_counter(tag_id):
+    return f"tag:{tag_id}"
+
+
+def _exact_count(name):
+    from .models import Question
+    if name == QUESTIONS:
+        return Question.objects.count()
+    if name == ANSWERED:
+        return Question.objects.filter(answer_count__gt=0).count()
+    if name == UNANSWERED:
+        return Question.objects.filter(answer_count=0).count()
+    tag_id = int(name.split(":")[1])
+    return Question.tags.through.objects.filter(tag_id=tag_id).count()
+
+
+def counter_value(name):
+    '''Read a maintained count, computing and storing it the first
+    time it is asked for.'''
+    from .models import ListingCount
+    total = ListingCount.objects.filter(name=name).values_list(
+        "total", flat=True
+    ).first()
+    if total is None:
+        total = ListingCount.objects.get_or_create(
+            name=name, defaults={'total': _exact_count(name)}
+        )[0].total
+    return total
+
+
+def adjust_counters(deltas):
+    '''Apply deltas to the counters that have already been computed;
+    counters that do not exist yet are computed exactly when read.'''
+    from .models import ListingCount
+    for name, delta in deltas.items():
+        if delta:
+            ListingCount.objects.filter(name=name).update(
+                total=F("total") + delta
+            )
+
+
+def adjust_answer_count(question_id, delta):
+    '''Move a question's answer_count by delta in a single UPDATE and
+    return the new value, or None when the question no longer exists.'''
+    from .models import Question
+    questions = Question.objects.filter(id=question_id)
+    if not questions.update(answer_count=F("answer_count") + delta):
+        return None
+    return questions.values_list("answer_count", flat=True).first()
+
+
+def answer_count_drift():
+    '''Return (question_id, actual) pairs for every question whose
+    stored answer_count disagrees with its answers.'''
+    from .models import Question, Answer
+    actual = Answer.objects.filter(question=OuterRef("pk")).order_by().values(
+        "question"
+    ).annotate(total=Count("id")).values("total")
+    return list(Question.objects.annotate(
+        actual=Coalesce(Subquery(actual), 0)
+    ).exclude(answer_count=F("actual")).values_list("id", "actual"))
+
+
+def reconcile_answer_counts(batch_size=500):
+    '''Overwrite drifted answer_count values and return how many
+    questions were corrected.'''
+    from .models import Question
+    questions = [
+        Question(id=question_id, answer_count=actual)
+        for question_id, actual in answer_count_drift()
+    ]
+    Question.objects.bulk_update(questions, ["answer_count"], batch_size)
+    return len(questions)
+
+
+def tab_count(tab):
+    return ResultCount(counter_value(TAB_COUNTERS.get(tab, QUESTIONS)))
+
+
+def tag_count(tag_id):
+    return ResultCount(counter_value(tag_counter(tag_id)))
+
+
+def search_count(query_data, tab):
+    '''Return the maintained count of the questions a search matches
+    when a counter counts exactly those: searches of one tag on the
+    newest tab, or of nothing but whether questions are answered. Any
+    other search returns None.'''
+    from .models import Tag
+    if query_data._replace(tags=(), answered=None) != type(query_data)():
+        return None
+    if tab not in ("relevance", *TAB_COUNTERS):
+        return None
+    answered = query_data.answered
+    tab_answered = {"active": True, "unanswered": False}.get(tab)
+    if tab_answered is not None:
+        if answered not in (None, tab_answered):
+            return None
+        answered = tab_answered
+    if not query_data.tags:
+        if answered is None:
+            return tab_count("newest")
+        return tab_count("active" if answered else "unanswered")
+    if len(query_data.tags) > 1 or answered is not None:
+        return None
+    tag_id = Tag.objects.filter(name__iexact=query_data.tags[0]).values_list(
+        "id", flat=True
+    ).first()
+    return None if tag_id is None else tag_count(tag_id)
+
+
+def estimate_count(queryset):
+    '''Count a queryset exactly when it matches at most ESTIMATE_ABOVE
+    questions. Larger results are estimated from the share of matches
+    among the newest ESTIMATE_ABOVE question ids, scaled to the total
+    number of questions.'''
+    bounded = queryset.order_by()[:ESTIMATE_ABOVE + 1].count()
+    if bounded <= ESTIMATE_ABOVE:
+        return ResultCount(bounded)
+    from .models import Question
+    total = counter_value(QUESTIONS)
+    newest_id = Question.objects.order_by("-id").values_list("id", flat=True).first()
+    window = min(ESTIMATE_ABOVE, total)
+    sampled = queryset.order_by().filter(id__gt=newest_id - window).count()
+    estimate = max(round(sampled * total / window, -2), ESTIMATE_ABOVE + 1)
+    return ResultCount(estimate, estimated=True)
+
+
+def cached_count(queryset, *key_parts):
+    '''Count an arbitrary listing, caching the result under the listing
+    version for at most COUNT_CACHE_TIMEOUT seconds.'''
+    key = ":".join(str(part) for part in (
+        "posts:count", caching.listing_version(), *key_parts
+    ))
+    count = cache.get(key)
+    if count is None:
+        count = estimate_count(queryset)
+        cache.set(key, (int(count), count.estimated), COUNT_CACHE_TIMEOUT)
+        return count
+    return ResultCount(*count)
+
+
+def tagged_count(queryset, tags, tab):
+    '''Count the questions carrying every one of tags on a tab that no
+    counter covers. The score tab is also keyed by the score version,
+    since votes move questions in and out of it.'''
+    digest = md5("|".join(sorted(tag.lower() for tag in tags)).encode()).hexdigest()
+    if tab == "score":
+        return cached_count(queryset, "tagged", tab, caching.score_version(), digest)
+    return cached_count(queryset, "tagged", tab, digest)
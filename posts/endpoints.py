@@ -1,18 +1,38 @@
 
+from datetime import timedelta
+
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import AnonymousUser
-from django.db.models import F
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import etag
 
 from rest_framework.views import APIView
 from rest_framework.status import (
-    HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_204_NO_CONTENT
+    HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_204_NO_CONTENT,
+    HTTP_404_NOT_FOUND
 )
 from rest_framework.response import Response
 from rest_framework.parsers import JSONParser
 from rest_framework.renderers import JSONRenderer
+from rest_framework.throttling import ScopedRateThrottle
 
 from .models import Question, Answer, Vote
-from .serializers import VoteSerializer, CurrentPostStateSerializer
+from .serializers import (
+    VoteSerializer, CurrentPostStateSerializer, VoteOperationSerializer
+)
+from .tagindex import tag_completion, TAG_COMPLETION_LIMIT
+from .pagehits import page_hit_setting, view_history
+from . import caching, votes
+
+BATCH_VOTE_LIMIT = 100
+
+
+def vote_state_etag(request, id):
+    '''Weak ETag of the requesting user's vote state on a question,
+    which changes with the question's version.'''
+    user = request.user
+    return f'W/"{caching.question_etag(id, user.id if user.is_authenticated else 0)}"'
 
 
 class UserVoteEndpoint(APIView):
@@ -32,6 +52,7 @@ class UserVoteEndpoint(APIView):
         post = model_content_type.get_object_for_this_type(id=id)
         return post
 
+    @method_decorator(etag(vote_state_etag))
     def get(self, request, id):
         question = Question.objects.get(id=id)
         serializer = CurrentPostStateSerializer(
@@ -43,11 +64,12 @@ class UserVoteEndpoint(APIView):
         if isinstance(request.user, AnonymousUser):
             return Response(status=HTTP_400_BAD_REQUEST)
         post = self.retrieve_user_post(id, request.data['post'])
-        serializer = VoteSerializer(data={'profile': request.user.profile.id},
-            context={'post': post, 'vote_type': request.data['type']} , partial=True
+        serializer = VoteSerializer(
+            data={'profile': request.user.profile.id, 'type': request.data['type']},
+            context={'post': post}
         )
         if serializer.is_valid(raise_exception=True):
-            serializer.save(type=request.data["type"], content_object=post)
+            serializer.save()
             return Response(status=HTTP_201_CREATED)
 
     def put(self, request, id):
@@ -63,12 +85,96 @@ class UserVoteEndpoint(APIView):
 
     def delete(self, request, id):
         post = self.retrieve_user_post(id, request.data.pop("post"))
-        vote = post.vote.get(profile=request.user.profile)
-        if vote.type == "dislike":
-            post.score = F("score") + 1
-        else:
-            post.score = F("score") - 1
-        post.save()
-        post.refresh_from_db()
-        vote.delete()
+        change = votes.retract_vote(
+            request.user.profile, post, request.data.get("type")
+        )
+        if not change.delta:
+            return Response(status=HTTP_404_NOT_FOUND)
         return Response(status=HTTP_204_NO_CONTENT)
+
+
+class BatchVoteEndpoint(APIView):
+    '''Apply up to BATCH_VOTE_LIMIT vote operations in one request and
+    transaction, returning the new scores and the operations that
+    failed by their position in the request.'''
+
+    parser_classes = [JSONParser]
+    renderer_classes = [JSONRenderer]
+    throttle_classes = []
+
+    def post(self, request):
+        if isinstance(request.user, AnonymousUser):
+            return Response(status=HTTP_400_BAD_REQUEST)
+        if not isinstance(request.data, list) or not request.data:
+            return Response(
+                data={"detail": "Expected a list of vote operations"},
+                status=HTTP_400_BAD_REQUEST
+            )
+        if len(request.data) > BATCH_VOTE_LIMIT:
+            return Response(
+                data={"detail": f"At most {BATCH_VOTE_LIMIT} operations per request"},
+                status=HTTP_400_BAD_REQUEST
+            )
+        positions, operations, errors = [], [], []
+        for index, item in enumerate(request.data):
+            serializer = VoteOperationSerializer(data=item)
+            if serializer.is_valid():
+                positions.append(index)
+                operations.append(serializer.validated_data)
+            else:
+                errors.append({"index": index, "errors": serializer.errors})
+        scores, failures = votes.apply_vote_operations(
+            request.user.profile, operations
+        )
+        errors.extend(
+            {"index": positions[position], "errors": [error]}
+            for position, error in failures.items()
+        )
+        return Response(data={
+            "scores": scores,
+            "errors": sorted(errors, key=lambda error: error['index'])
+        })
+
+
+class TagCompletionEndpoint(APIView):
+    '''Suggest tags starting with a prefix, most used first. Served
+    from the in-process completion index, which is loaded and refreshed
+    outside the request; requests are throttled per client under the
+    "tag_completion" rate.'''
+
+    renderer_classes = [JSONRenderer]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = "tag_completion"
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            return Response(status=HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), TAG_COMPLETION_LIMIT)
+        prefix = request.query_params.get("prefix", "")
+        return Response(data=[
+            {"name": name, "questions": total}
+            for name, total in tag_completion.complete(prefix, limit)
+        ])
+
+
+class QuestionViewHistoryEndpoint(APIView):
+    '''Daily hits and unique viewers of a question over the last
+    "days" days, at most VIEW_HISTORY_DAYS, read from the compacted
+    rollups only.'''
+
+    renderer_classes = [JSONRenderer]
+    throttle_classes = []
+
+    def get(self, request, id):
+        try:
+            days = int(request.query_params.get("days", 30))
+        except ValueError:
+            return Response(status=HTTP_400_BAD_REQUEST)
+        days = min(max(days, 1), page_hit_setting("VIEW_HISTORY_DAYS"))
+        since = timezone.localdate() - timedelta(days=days)
+        return Response(data=[
+            {"day": day, "hits": hits, "unique_viewers": unique_viewers}
+            for day, hits, unique_viewers in view_history(id, since)
+        ])
@@ -0,0 +1,64 @@
+from datetime import date
+import math
+
+from django.conf import settings
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+HOT_SCORE_GRAVITY = getattr(settings, "HOT_SCORE_GRAVITY", 1.5)
+HOT_SCORE_ANSWER_WEIGHT = getattr(settings, "HOT_SCORE_ANSWER_WEIGHT", 2.0)
+HOT_SCORE_VIEW_WEIGHT = getattr(settings, "HOT_SCORE_VIEW_WEIGHT", 0.5)
+
+
+def hot_score(score, answer_count, views, age_days):
+    '''Rank a question by its votes, answers and views, decayed by the
+    number of days since it was asked.'''
+    activity = (
+        math.copysign(math.log10(max(abs(score), 1)), score)
+        + HOT_SCORE_ANSWER_WEIGHT * math.log1p(answer_count)
+        + HOT_SCORE_VIEW_WEIGHT * math.log1p(views)
+    )
+    return (activity + 1) / (max(age_days, 0) + 2) ** HOT_SCORE_GRAVITY
+
+
+def hot_scores(scores, answer_counts, views, ages):
+    '''Vectorized hot_score over parallel sequences; falls back to a
+    Python loop when NumPy is not installed.'''
+    if numpy is None:
+        return [
+            hot_score(*row) for row in zip(scores, answer_counts, views, ages)
+        ]
+    scores = numpy.asarray(scores, dtype=float)
+    activity = (
+        numpy.sign(scores) * numpy.log10(numpy.maximum(numpy.abs(scores), 1))
+        + HOT_SCORE_ANSWER_WEIGHT * numpy.log1p(numpy.asarray(answer_counts, dtype=float))
+        + HOT_SCORE_VIEW_WEIGHT * numpy.log1p(numpy.asarray(views, dtype=float))
+    )
+    ages = numpy.maximum(numpy.asarray(ages, dtype=float), 0)
+    return ((activity + 1) / (ages + 2) ** HOT_SCORE_GRAVITY).tolist()
+
+
+def recompute_hotness(batch_size=2000, today=None):
+    '''Recompute Question.hotness over the whole table in primary key
+    batches, writing each batch back with one bulk UPDATE. Returns the
+    number of questions scored.'''
+    from .models import Question
+    today = today or date.today()
+    total, last_id = 0, 0
+    while True:
+        rows = list(Question.objects.filter(id__gt=last_id).order_by("id").values_list(
+            "id", "score", "answer_count", "views", "date"
+        )[:batch_size])
+        if not rows:
+            return total
+        ids, scores, answer_counts, views, dates = zip(*rows)
+        ages = [(today - asked).days for asked in dates]
+        Question.objects.bulk_update([
+            Question(id=question_id, hotness=hotness) for question_id, hotness
+            in zip(ids, hot_scores(scores, answer_counts, views, ages))
+        ], ["hotness"])
+        total += len(rows)
+        last_id = ids[-1]
@@ -0,0 +1,56 @@
+from hashlib import blake2b
+import math
+import zlib
+
+HLL_PRECISION = 14
+
+
+class HyperLogLog:
+    '''Estimate the number of distinct values added to it in a fixed
+    2 ** precision bytes. The default precision of 14 has a standard
+    error of 1.04 / sqrt(2 ** 14), about 0.8%.
+
+    Sketches of the same precision merge into the sketch of the union
+    of their values, so sketches kept by different processes or for
+    different days can be combined without the values themselves.'''
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = bytearray(registers or 1 << precision)
+
+    def add(self, value):
+        hashed = int.from_bytes(
+            blake2b(str(value).encode(), digest_size=8).digest(), "big"
+        )
+        bits = 64 - self.precision
+        index = hashed >> bits
+        rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        harmonic = sum(
+            self.registers.count(rank) * 2.0 ** -rank
+            for rank in range(max(self.registers) + 1)
+        )
+        estimate = alpha * size * size / harmonic
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return round(estimate)
+
+    def to_bytes(self):
+        return bytes([self.precision]) + zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        return cls(data[0], zlib.decompress(data[1:]))
@@ -0,0 +1,21 @@
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+
+from .models import Question, Answer
+
+
+def question_page_queryset():
+    '''Questions with everything their page renders: the author, the
+    tags and the answers with their authors. Evaluating it costs three
+    queries however many answers a question has.'''
+    return Question.objects.select_related("profile__user").prefetch_related(
+        "tags",
+        Prefetch(
+            "answers",
+            queryset=Answer.objects.select_related("profile__user").order_by("id")
+        )
+    )
+
+
+def load_question_page(question_id):
+    return get_object_or_404(question_page_queryset(), id=question_id)
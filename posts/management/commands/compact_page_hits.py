@@ -0,0 +1,36 @@
+from datetime import timedelta
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.pagehits import compact_page_hits, page_hit_setting, page_hits
+
+
+class Command(BaseCommand):
+
+    help = "Roll old question page hits into daily rollups and delete them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int,
+            help="Keep the raw hits of this many most recent days; "
+                 "defaults to PAGE_HIT_RETENTION_DAYS"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Number of hits rolled up and deleted per transaction"
+        )
+
+    def handle(self, *args, **options):
+        page_hits.flush()
+        days = options['days']
+        if days is None:
+            days = page_hit_setting("PAGE_HIT_RETENTION_DAYS")
+        started = time.monotonic()
+        before = timezone.now() - timedelta(days=days)
+        total = compact_page_hits(before, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {total} page hits older than {days} days "
+            f"in {time.monotonic() - started:.2f}s"
+        ))
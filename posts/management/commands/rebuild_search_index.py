@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+
+    help = "Rebuild the full-text index over question titles and bodies"
+
+    def handle(self, *args, **options):
+        if not search.fulltext_enabled():
+            self.stdout.write("Full-text indexing is only available on SQLite")
+            return
+        total = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} questions"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.affinity import rebuild_affinity
+
+
+class Command(BaseCommand):
+
+    help = "Recompute every profile's tag affinities from their posts and votes"
+
+    def handle(self, *args, **options):
+        total = rebuild_affinity()
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {total} profile tag affinities"
+        ))
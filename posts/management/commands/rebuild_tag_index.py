@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.tagindex import tag_index
+
+
+class Command(BaseCommand):
+
+    help = "Rebuild the tag posting lists used by tagged question searches"
+
+    def handle(self, *args, **options):
+        tag_index.invalidate()
+        postings = tag_index.rebuild()
+        total = sum(len(posting) for posting in postings.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {total} taggings across {len(postings)} tags"
+        ))
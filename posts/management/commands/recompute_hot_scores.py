@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import hotness
+
+
+class Command(BaseCommand):
+
+    help = "Recompute the time-decayed hot score of every question"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=2000,
+            help="Number of questions scored per UPDATE"
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = hotness.recompute_hotness(options['batch_size'])
+        engine = "NumPy" if hotness.numpy is not None else "Python"
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {total} questions with {engine} in "
+            f"{time.monotonic() - started:.2f}s"
+        ))
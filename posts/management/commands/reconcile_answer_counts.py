@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.counts import answer_count_drift, reconcile_answer_counts
+
+
+class Command(BaseCommand):
+
+    help = "Backfill Question.answer_count and correct any drifted values"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report drifted questions without updating them"
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            drifted = len(answer_count_drift())
+            self.stdout.write(f"{drifted} questions have a drifted answer count")
+            return
+        corrected = reconcile_answer_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f"Corrected the answer count of {corrected} questions"
+        ))
@@ -0,0 +1,74 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from posts import scorebuffer
+from posts.utils import id_chunks
+from posts.votes import VOTE_MODELS, ScoreDrift, reconcile_score_chunk
+
+
+def _reconcile_in_worker(model_name, dry_run, chunk):
+    try:
+        return reconcile_score_chunk(model_name, *chunk, dry_run=dry_run)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Recompute question and answer scores from their votes, fixing drift. "
+        "Refuses to run while SCORE_BUFFER_ENABLED is set, as deltas still "
+        "buffered by web processes would be added to the recomputed scores."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model", choices=list(VOTE_MODELS), action="append",
+            help="Reconcile only this kind of post; may be repeated"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=5000,
+            help="Number of primary keys reconciled per chunk"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Reconcile chunks across this many processes"
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report drift without updating any score"
+        )
+
+    def handle(self, *args, **options):
+        if scorebuffer.SCORE_BUFFER_ENABLED:
+            raise CommandError(
+                "Scores cannot be reconciled while SCORE_BUFFER_ENABLED is set"
+            )
+        for model_name in options['model'] or list(VOTE_MODELS):
+            chunks = id_chunks(VOTE_MODELS[model_name], options['chunk_size'])
+            reconcile = partial(_reconcile_in_worker, model_name, options['dry_run'])
+            started = time.monotonic()
+            if options['workers'] > 1 and len(chunks) > 1:
+                # Forked workers must open their own database connections.
+                connections.close_all()
+                with ProcessPoolExecutor(options['workers']) as pool:
+                    results = list(pool.map(reconcile, chunks))
+            else:
+                results = [
+                    reconcile_score_chunk(model_name, *chunk, dry_run=options['dry_run'])
+                    for chunk in chunks
+                ]
+            elapsed = time.monotonic() - started
+            drift = sum(results, ScoreDrift())
+            rate = drift.checked / elapsed if elapsed else 0
+            action = "found" if options['dry_run'] else "fixed"
+            self.stdout.write(self.style.SUCCESS(
+                f"{model_name}: checked {drift.checked} posts in {len(chunks)} "
+                f"chunks ({rate:.0f} posts/s), {action} {drift.mismatched} "
+                f"mismatched scores, total drift {drift.drift}, "
+                f"largest drift {drift.largest}"
+            ))
@@ -0,0 +1,61 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.rendering import RENDERED_MODELS, render_chunk
+from posts.utils import id_chunks
+
+
+def _render_in_worker(model_name, force, chunk):
+    try:
+        return render_chunk(model_name, *chunk, force=force)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+
+    help = "Render post bodies to HTML where the stored HTML is stale"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model", choices=list(RENDERED_MODELS), action="append",
+            help="Render only this kind of post; may be repeated"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000,
+            help="Number of primary keys rendered per chunk"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Render chunks across this many processes"
+        )
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Render every body, even where the stored HTML is current"
+        )
+
+    def handle(self, *args, **options):
+        for model_name in options['model'] or list(RENDERED_MODELS):
+            chunks = id_chunks(RENDERED_MODELS[model_name], options['chunk_size'])
+            render = partial(_render_in_worker, model_name, options['force'])
+            started = time.monotonic()
+            if options['workers'] > 1 and len(chunks) > 1:
+                # Forked workers must open their own database connections.
+                connections.close_all()
+                with ProcessPoolExecutor(options['workers']) as pool:
+                    results = list(pool.map(render, chunks))
+            else:
+                results = [
+                    render_chunk(model_name, *chunk, force=options['force'])
+                    for chunk in chunks
+                ]
+            checked = sum(result[0] for result in results)
+            rendered = sum(result[1] for result in results)
+            self.stdout.write(self.style.SUCCESS(
+                f"{model_name}: rendered {rendered} of {checked} posts in "
+                f"{len(chunks)} chunks in {time.monotonic() - started:.2f}s"
+            ))
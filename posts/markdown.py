@@ -0,0 +1,124 @@
+import re
+
+from django.utils.html import escape
+
+# Bump whenever the rendered output changes so that stored HTML is
+# recognised as stale and re-rendered.
+MARKDOWN_VERSION = 1
+
+FENCE = re.compile(r"^\s*```")
+HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+RULE = re.compile(r"^\s{0,3}([*_-])(?:\s*\1){2,}\s*$")
+QUOTE = re.compile(r"^\s{0,3}>\s?(.*)$")
+LIST_ITEM = re.compile(r"^\s{0,3}(?:[*+-]|\d{1,9}[.)])\s+(.*)$")
+INDENTED = re.compile(r"^(?: {2,}|\t)\S")
+
+CODE_SPAN = re.compile(r"(`+)(.+?)\1", re.DOTALL)
+LINK = re.compile(r"\[([^\[\]]+)\]\(\s*([^()\s]+)\s*\)")
+STRONG = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+EMPHASIS = re.compile(
+    r"\*(?=[^\s*])(.+?)(?<=[^\s*])\*|(?<!\w)_(?=[^\s_])(.+?)(?<=[^\s_])_(?!\w)"
+)
+STRIKETHROUGH = re.compile(r"~~(?=\S)(.+?)(?<=\S)~~")
+SAFE_URL = re.compile(r"(?:https?://|mailto:|/|#)|[^:]*$", re.IGNORECASE)
+PLACEHOLDER = re.compile("\x00(\\d+)\x00")
+
+
+def render_inline(text):
+    '''Render the inline Markdown of text, which is escaped before any
+    of it is interpreted. Code spans are set aside first so that their
+    contents are never styled.'''
+    spans = []
+
+    def hold(html):
+        spans.append(html)
+        return f"\x00{len(spans) - 1}\x00"
+
+    text = CODE_SPAN.sub(
+        lambda match: hold(
+            f'<code class="block_code_snippet">{escape(match[2].strip())}</code>'
+        ), text
+    )
+    html = escape(text)
+    html = LINK.sub(_link, html)
+    html = STRONG.sub(r"<strong>\2</strong>", html)
+    html = EMPHASIS.sub(lambda match: f"<em>{match[1] or match[2]}</em>", html)
+    html = STRIKETHROUGH.sub(r"<del>\1</del>", html)
+    return PLACEHOLDER.sub(lambda match: spans[int(match[1])], html)
+
+
+def _link(match):
+    title, url = match.groups()
+    # The URL is already escaped; only its scheme needs checking.
+    if not SAFE_URL.match(url):
+        return title
+    return f'<a href="{url}">{title}</a>'
+
+
+def _lines(text):
+    return text.replace("\x00", "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+
+
+def render_markdown(text):
+    '''Render Markdown to HTML the way the marked renderer in
+    md_renderer.js does with gfm line breaks: fenced code blocks,
+    headings, rules, blockquotes, list items and paragraphs, with
+    inline code, links, bold, italic and strikethrough.
+
+    Every character of the source is HTML-escaped before it reaches the
+    output, so only the markup produced here can appear in it.'''
+    return "".join(_render_blocks(_lines(text)))
+
+
+def _render_blocks(lines):
+    position = 0
+    while position < len(lines):
+        line = lines[position]
+        if not line.strip():
+            position += 1
+        elif FENCE.match(line):
+            end = position + 1
+            while end < len(lines) and not FENCE.match(lines[end]):
+                end += 1
+            code = escape("\n".join(lines[position + 1:end]))
+            yield (
+                f'<br/><pre><code class="block_code_snippet fill_block_width">'
+                f"{code}</code></pre><br/>"
+            )
+            position = end + 1
+        elif HEADING.match(line):
+            hashes, title = HEADING.match(line).groups()
+            yield f"<h{len(hashes)}>{render_inline(title)}</h{len(hashes)}>"
+            position += 1
+        elif RULE.match(line):
+            yield "<hr>"
+            position += 1
+        elif QUOTE.match(line):
+            quoted = []
+            while position < len(lines) and QUOTE.match(lines[position]):
+                quoted.append(QUOTE.match(lines[position])[1])
+                position += 1
+            yield f"<blockquote>{''.join(_render_blocks(quoted))}</blockquote>"
+        elif LIST_ITEM.match(line):
+            # Like md_renderer.js, items are not wrapped in a list.
+            while position < len(lines) and LIST_ITEM.match(lines[position]):
+                item = [LIST_ITEM.match(lines[position])[1]]
+                position += 1
+                while position < len(lines) and INDENTED.match(lines[position]):
+                    item.append(lines[position].strip())
+                    position += 1
+                yield f'<li class="mk_list_item">{_render_lines(item)}</li>'
+        else:
+            paragraph = []
+            while position < len(lines) and lines[position].strip() and not (
+                FENCE.match(lines[position]) or HEADING.match(lines[position])
+                or RULE.match(lines[position]) or QUOTE.match(lines[position])
+                or LIST_ITEM.match(lines[position])
+            ):
+                paragraph.append(lines[position].strip())
+                position += 1
+            yield f"<p>{_render_lines(paragraph)}</p>"
+
+
+def _render_lines(lines):
+    return "<br>".join(render_inline(line) for line in lines)
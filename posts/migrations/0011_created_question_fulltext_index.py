@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS question_fts USING fts5("
+        "title, body, tokenize='porter unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO question_fts (rowid, title, body) "
+        "SELECT id, title, body FROM question"
+    )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS question_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_questionpagehit_profile'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-17 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_created_question_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexStamp',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=25, unique=True)),
+                ('token', models.CharField(max_length=32)),
+            ],
+            options={
+                'db_table': 'indexstamp',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_created_tag_index_stamp'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-date', 'views', '-score', 'id'], name='question_listing_order'),
+        ),
+    ]
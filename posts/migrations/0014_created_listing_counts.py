@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_added_listing_order_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=40, unique=True)),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'listingcount',
+                'managed': True,
+            },
+        ),
+    ]
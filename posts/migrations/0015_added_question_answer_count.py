@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_answer_count(apps, schema_editor):
+    Question = apps.get_model("posts", "Question")
+    Answer = apps.get_model("posts", "Answer")
+    total = Answer.objects.filter(question=OuterRef("pk")).order_by().values(
+        "question"
+    ).annotate(total=Count("id")).values("total")
+    Question.objects.update(answer_count=Coalesce(Subquery(total), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_created_listing_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='answer_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_answer_count, migrations.RunPython.noop),
+    ]
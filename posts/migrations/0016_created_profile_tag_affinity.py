@@ -0,0 +1,78 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from collections import Counter
+
+ASK_WEIGHT, ANSWER_WEIGHT, VOTE_WEIGHT = 3, 2, 1
+
+
+def backfill_tag_affinity(apps, schema_editor):
+    Question = apps.get_model("posts", "Question")
+    Answer = apps.get_model("posts", "Answer")
+    Vote = apps.get_model("posts", "Vote")
+    ProfileTagAffinity = apps.get_model("posts", "ProfileTagAffinity")
+    taggings = {}
+    for question_id, tag_id in Question.tags.through.objects.values_list(
+        "question_id", "tag_id"
+    ):
+        taggings.setdefault(question_id, []).append(tag_id)
+    answer_questions = dict(Answer.objects.values_list("id", "question_id"))
+    weights = Counter()
+    credits = [
+        (profile_id, question_id, ASK_WEIGHT) for profile_id, question_id
+        in Question.objects.values_list("profile_id", "id")
+    ] + [
+        (profile_id, question_id, ANSWER_WEIGHT) for profile_id, question_id
+        in Answer.objects.values_list("profile_id", "question_id")
+    ]
+    for profile_id, model, object_id in Vote.objects.values_list(
+        "profile_id", "content_type__model", "object_id"
+    ):
+        if model == "answer":
+            object_id = answer_questions.get(object_id)
+        elif model != "question":
+            continue
+        credits.append((profile_id, object_id, VOTE_WEIGHT))
+    for profile_id, question_id, weight in credits:
+        if profile_id is not None:
+            for tag_id in taggings.get(question_id, ()):
+                weights[profile_id, tag_id] += weight
+    ProfileTagAffinity.objects.bulk_create([
+        ProfileTagAffinity(profile_id=profile_id, tag_id=tag_id, weight=weight)
+        for (profile_id, tag_id), weight in weights.items()
+    ], 1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authors', '0002_create_project_models'),
+        ('posts', '0015_added_question_answer_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileTagAffinity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.IntegerField(default=0)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_affinities', to='authors.profile')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='affinities', to='posts.tag')),
+            ],
+            options={
+                'db_table': 'profiletagaffinity',
+                'managed': True,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='profiletagaffinity',
+            index=models.Index(fields=['profile', 'weight', 'tag'], name='profile_tag_affinity'),
+        ),
+        migrations.AddConstraint(
+            model_name='profiletagaffinity',
+            constraint=models.UniqueConstraint(fields=('profile', 'tag'), name='unique_profile_tag_affinity'),
+        ),
+        migrations.RunPython(backfill_tag_affinity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:08
+
+from datetime import date
+import math
+
+from django.db import migrations, models
+
+
+def hot_score(score, answer_count, views, age_days):
+    # Frozen copy of posts.hotness.hot_score with its default weights, so
+    # this migration keeps producing the same values if the formula changes.
+    # Run the recompute_hot_scores command to apply the current formula.
+    activity = (
+        math.copysign(math.log10(max(abs(score), 1)), score)
+        + 2.0 * math.log1p(answer_count)
+        + 0.5 * math.log1p(views)
+    )
+    return (activity + 1) / (max(age_days, 0) + 2) ** 1.5
+
+
+def backfill_hotness(apps, schema_editor):
+    Question = apps.get_model("posts", "Question")
+    rows = list(Question.objects.values_list(
+        "id", "score", "answer_count", "views", "date"
+    ))
+    if not rows:
+        return
+    ids, scores, answer_counts, views, dates = zip(*rows)
+    ages = [(date.today() - asked).days for asked in dates]
+    Question.objects.bulk_update([
+        Question(id=question_id, hotness=hotness) for question_id, hotness
+        in zip(ids, map(hot_score, scores, answer_counts, views, ages))
+    ], ["hotness"], 1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_created_profile_tag_affinity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='hotness',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-hotness', 'date', 'id'], name='question_hot_order'),
+        ),
+        migrations.RunPython(backfill_hotness, migrations.RunPython.noop),
+    ]
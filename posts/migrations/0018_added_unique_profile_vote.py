@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:11
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_votes(apps, schema_editor):
+    Vote = apps.get_model("posts", "Vote")
+    duplicates = Vote.objects.filter(profile__isnull=False).values(
+        "profile", "content_type", "object_id"
+    ).annotate(first=Min("id"), total=Count("id")).filter(total__gt=1)
+    for duplicate in duplicates:
+        Vote.objects.filter(
+            profile=duplicate['profile'],
+            content_type=duplicate['content_type'],
+            object_id=duplicate['object_id']
+        ).exclude(id=duplicate['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_added_question_hot_score'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_votes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('profile', 'content_type', 'object_id'), name='unique_profile_vote'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations, models
+from django.db.models import Case, Max, Min, Value, When
+
+import posts.models
+
+VOTE_TYPE_CODES = {"up": 1, "like": 2, "down": -1, "dislike": -2}
+BATCH_SIZE = 10000
+
+
+def convert_vote_types(apps, schema_editor):
+    '''Copy each vote's type name into its code one primary key range
+    at a time, so that no single UPDATE holds the table for long.
+    Unrecognised names were counted as upvotes and become "up".'''
+    Vote = apps.get_model("posts", "Vote")
+    bounds = Vote.objects.aggregate(low=Min("id"), high=Max("id"))
+    if bounds['low'] is None:
+        return
+    code = Case(
+        *[When(type=name, then=Value(code)) for name, code in VOTE_TYPE_CODES.items()],
+        default=Value(1), output_field=models.SmallIntegerField()
+    )
+    for low in range(bounds['low'], bounds['high'] + 1, BATCH_SIZE):
+        Vote.objects.filter(id__gte=low, id__lt=low + BATCH_SIZE).update(
+            type_code=code
+        )
+
+
+def restore_vote_types(apps, schema_editor):
+    Vote = apps.get_model("posts", "Vote")
+    Vote.objects.update(type=Case(
+        *[When(type_code=code, then=Value(name)) for name, code in VOTE_TYPE_CODES.items()],
+        default=Value("up"), output_field=models.CharField()
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('authors', '0002_create_project_models'),
+        ('posts', '0018_added_unique_profile_vote'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vote',
+            name='type_code',
+            field=models.SmallIntegerField(null=True),
+        ),
+        migrations.RunPython(convert_vote_types, restore_vote_types),
+        migrations.RemoveConstraint(
+            model_name='vote',
+            name='unique_profile_vote',
+        ),
+        # A default lets the old column be added back when reversing.
+        migrations.AlterField(
+            model_name='vote',
+            name='type',
+            field=models.CharField(max_length=7, default="up"),
+        ),
+        migrations.RemoveField(
+            model_name='vote',
+            name='type',
+        ),
+        migrations.RenameField(
+            model_name='vote',
+            old_name='type_code',
+            new_name='type',
+        ),
+        migrations.AlterField(
+            model_name='vote',
+            name='type',
+            field=posts.models.VoteTypeField(),
+        ),
+        migrations.AddConstraint(
+            model_name='vote',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id', 'profile'), name='unique_post_vote'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:27
+
+from hashlib import blake2b
+import math
+import zlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Frozen copy of the posts.hyperloglog encoding as of this migration, so
+# the sketches written here stay readable however that module changes.
+PRECISION = 14
+
+
+def sketch_add(registers, value):
+    hashed = int.from_bytes(
+        blake2b(str(value).encode(), digest_size=8).digest(), "big"
+    )
+    bits = 64 - PRECISION
+    index = hashed >> bits
+    rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+    if rank > registers[index]:
+        registers[index] = rank
+
+
+def sketch_count(registers):
+    size = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / size)
+    harmonic = sum(
+        registers.count(rank) * 2.0 ** -rank
+        for rank in range(max(registers) + 1)
+    )
+    estimate = alpha * size * size / harmonic
+    zeros = registers.count(0)
+    if estimate <= 2.5 * size and zeros:
+        estimate = size * math.log(size / zeros)
+    return round(estimate)
+
+
+def sketch_bytes(registers):
+    return bytes([PRECISION]) + zlib.compress(bytes(registers))
+
+
+def backfill_view_sketches(apps, schema_editor):
+    Question = apps.get_model("posts", "Question")
+    QuestionPageHit = apps.get_model("posts", "QuestionPageHit")
+    QuestionViewSketch = apps.get_model("posts", "QuestionViewSketch")
+    sketches = {}
+    for question_id, profile_id, address in QuestionPageHit.objects.values_list(
+        "question_id", "profile_id", "address"
+    ).iterator():
+        registers = sketches.setdefault(question_id, bytearray(1 << PRECISION))
+        sketch_add(registers, f"profile:{profile_id}" if profile_id else f"address:{address}")
+    QuestionViewSketch.objects.bulk_create([
+        QuestionViewSketch(question_id=question_id, sketch=sketch_bytes(registers))
+        for question_id, registers in sketches.items()
+    ], 500)
+    Question.objects.bulk_update([
+        Question(id=question_id, views=sketch_count(registers))
+        for question_id, registers in sketches.items()
+    ], ["views"], 500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_converted_vote_type_codes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionViewSketch',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='view_sketch', serialize=False, to='posts.question')),
+                ('sketch', models.BinaryField()),
+            ],
+            options={
+                'db_table': 'questionviewsketch',
+                'managed': True,
+            },
+        ),
+        migrations.RunPython(backfill_view_sketches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_added_question_view_sketch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questionpagehit',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='QuestionViewRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('unique_viewers', models.PositiveIntegerField(default=0)),
+                ('sketch', models.BinaryField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_rollups', to='posts.question')),
+            ],
+            options={
+                'db_table': 'questionviewrollup',
+                'managed': True,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='questionviewrollup',
+            constraint=models.UniqueConstraint(fields=('question', 'day'), name='unique_question_view_day'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.25 on 2026-10-17 04:30
+
+from django.db import migrations, models
+
+
+# Existing posts are left with empty body_html. Rendering them depends on
+# the live Markdown renderer, so it is not frozen into this migration: run
+# "manage.py render_post_bodies" after migrating to fill the columns.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_added_page_hit_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='body_hash',
+            field=models.CharField(default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='body_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='body_hash',
+            field=models.CharField(default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='body_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='body_hash',
+            field=models.CharField(default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='body_html',
+            field=models.TextField(default='', editable=False),
+        ),
+    ]
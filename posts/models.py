@@ -1,77 +1,182 @@
 
 from datetime import date, timedelta
-from functools import reduce
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db.models import (
     Model, ManyToManyField, ForeignKey, CASCADE, SET_NULL, CharField,
      TextField, PositiveIntegerField, IntegerField, DateField,
-     GenericIPAddressField, Manager, OuterRef, Subquery, Count, F,
-     UniqueConstraint, QuerySet, Q
+     GenericIPAddressField, Manager, OuterRef, Subquery, Count, F, FloatField,
+     SmallIntegerField, OneToOneField, BinaryField, DateTimeField,
+     UniqueConstraint, QuerySet, Q, Index
 )
+from django.db.models.functions import Substr
+from django.db.models.query import ValuesIterable
 
 from django.contrib.contenttypes.fields import (
     GenericForeignKey,  GenericRelation
 )
 from django.contrib.contenttypes.models import ContentType
 
-from .utils import resolve_search_query
+from django.core.cache import cache
+from django.utils import timezone
 
+from .pagination import HOT_ORDER, LISTING_ORDER
+from .utils import parse_search_query
+from . import caching, search
+from .tagindex import tag_index
+from .scorebuffer import score_buffer
 
-class QueryStringSearchManager(Manager):
+
+EXCERPT_LENGTH = 200
+# Tagged searches matching more questions than this filter by subquery.
+TAGGED_ID_LIMIT = 500
+ROW_FIELDS = ("id", "title", "score", "views", "answer_count", "date", "hotness")
+
+
+class QuestionRow:
+    '''A question as a listing shows it, without its body.'''
+
+    __slots__ = ROW_FIELDS + ("excerpt", "author", "tags")
+
+    def __init__(self, tags=(), **values):
+        for name, value in values.items():
+            setattr(self, name, value)
+        self.tags = list(tags)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(id={self.id}, title={self.title})"
+
+    @property
+    def live_score(self):
+        return self.score + score_buffer.pending(Question, self.id)
+
+
+class QuestionRowIterable(ValuesIterable):
+    '''Yield QuestionRows, loading the tag names of all of them with
+    one further query.'''
+
+    def __iter__(self):
+        rows = []
+        for values in super().__iter__():
+            excerpt = values['excerpt']
+            if len(excerpt) > EXCERPT_LENGTH:
+                values['excerpt'] = f"{excerpt[:EXCERPT_LENGTH].rstrip()}…"
+            rows.append(QuestionRow(**values))
+        tags = {}
+        if rows:
+            for question_id, name in Question.tags.through.objects.filter(
+                question_id__in=[row.id for row in rows]
+            ).order_by("id").values_list("question_id", "tag__name"):
+                tags.setdefault(question_id, []).append(name)
+        for row in rows:
+            row.tags = tags.get(row.id, [])
+            yield row
+
+
+class QuestionQuerySet(QuerySet):
+
+    def rows(self):
+        '''Evaluate to QuestionRows holding only what a listing shows:
+        the body is cut to an excerpt in the database, and authors and
+        tag names come from a join and a single tags query, so a page
+        of rows costs two queries whatever the size of its bodies.'''
+        queryset = self.values(
+            *ROW_FIELDS, author=F("profile__user__username"),
+            excerpt=Substr("body", 1, EXCERPT_LENGTH + 1)
+        )
+        queryset._iterable_class = QuestionRowIterable
+        return queryset
+
+
+QuestionManager = Manager.from_queryset(QuestionQuerySet)
+
+
+class QueryStringSearchManager(QuestionManager):
 
     def lookup(self, query, tab="newest"):
         qs_options = {
+            f"{self._relevance.__name__}": self._relevance,
             f"{self._unanswered.__name__}": self._unanswered,
             f"{self._active.__name__}": self._active,
             f"{self._newest.__name__}": self._newest,
             f"{self._score.__name__}": self._score
         }
-        queryset = super().get_queryset().order_by("-date", "views", "-score")
-        query_data = resolve_search_query(query)
-        if 'tags' in query_data and query_data['tags']:
-            q_objects = map(
-                lambda tag: Q(name__iexact=tag), query_data['tags']
+        queryset = super().get_queryset().order_by(*LISTING_ORDER)
+        query_data = parse_search_query(query)
+        if query_data.tags:
+            queryset = self._tagged(queryset, query_data.tags)
+        if query_data.terms or query_data.phrases:
+            queryset = search.search(
+                queryset, query_data.terms, query_data.phrases
             )
-            query = reduce(lambda q1, q2: q1 & q2, q_objects)
-            tags = Tag.objects.filter(query)
-            queryset = queryset.filter(tags__in=tags).distinct()
-        if 'title' in query_data and query_data['title']:
-            queryset = queryset.filter(title__contains=f"{query_data['title']}")
-        if 'user' in query_data and query_data['user']:
-            queryset = queryset.filter(profile_id=query_data['user'])
-        queryset = qs_options.get(f"_{tab}", "_newest")(queryset)
+        for title in query_data.titles:
+            queryset = queryset.filter(title__icontains=title)
+        if query_data.user:
+            queryset = queryset.filter(profile_id=query_data.user)
+        if query_data.score:
+            queryset = queryset.filter(query_data.score.as_q("score"))
+        if query_data.created:
+            queryset = queryset.filter(query_data.created.as_q("date"))
+        if query_data.answered is not None:
+            lookup = "answer_count__gt" if query_data.answered else "answer_count"
+            queryset = queryset.filter(**{lookup: 0})
+        queryset = qs_options.get(f"_{tab}", self._newest)(queryset)
         return queryset, query_data
 
+    def _tagged(self, queryset, tags):
+        '''Filter to the questions carrying every tag. A small
+        intersection from the tag index is bound as a list of ids; a
+        larger one is left to the database as one semi-join on the
+        tags table per tag, rather than one query parameter per id.'''
+        question_ids = tag_index.question_ids(tags)
+        if len(question_ids) <= TAGGED_ID_LIMIT:
+            return queryset.filter(id__in=question_ids)
+        for tag in tags:
+            queryset = queryset.filter(id__in=Question.tags.through.objects.filter(
+                tag__name__iexact=tag
+            ).values("question_id"))
+        return queryset
+
+    def lookup_ids(self, query, tab="newest"):
+        '''Return the ordered ids of every question matching the query,
+        cached under the current listing version so that paging and
+        switching tabs do not re-run the search.'''
+        query_data = parse_search_query(query)
+        tab = tab if hasattr(self, f"_{tab}") else "newest"
+        key = caching.search_results_key(query_data, tab)
+        question_ids = cache.get(key)
+        if question_ids is None:
+            queryset, query_data = self.lookup(query, tab)
+            question_ids = list(queryset.values_list("id", flat=True))
+            cache.set(key, question_ids, caching.SEARCH_RESULTS_TIMEOUT)
+        return question_ids, query_data
+
+    def _relevance(self, qs):
+        if "rank" not in qs.query.annotations:
+            return qs
+        return qs.order_by("rank", "-date")
+
     def _unanswered(self, qs):
-        return qs.annotate(
-            total_answers=Count('answer')
-        ).filter(total_answers__exact=0)
+        return qs.filter(answer_count=0)
 
     def _active(self, qs):
-        return qs.annotate(
-            total_answers=Count("answer")
-        ).filter(total_answers__gt=0)
+        return qs.filter(answer_count__gt=0)
 
     def _newest(self, qs):
         return qs
 
     def _score(self, qs):
-        import pdb; pdb.set_trace()
         return qs.filter(score__gte=0)
 
 
-class QuestionSearchManager(Manager):
+class QuestionSearchManager(QuestionManager):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
     def get_queryset(self):
-        queryset = super().get_queryset().prefetch_related("tags")
-        return queryset.annotate(
-            answer_tally=Count('answer')
-        ).order_by("-date", "views", "-score")
+        return super().get_queryset().order_by(*LISTING_ORDER)
 
     def lookup(self, user, tab="interesting"):
         qs_options = {
@@ -81,48 +186,41 @@ class QuestionSearchManager(Manager):
             f"{self._month.__name__}": self._month,
         }
         if not isinstance(user, get_user_model()):
-            return Question.objects.all()
+            return self.get_queryset()
         return qs_options.get(f"_{tab}", "_interesting")(user.profile)
 
     def _interesting(self, profile):
-        return self.get_queryset().filter(
-            tags__name__in=profile.questions.values_list(
-                "tags__name", flat=True
-            )
-        )
+        return self._affinity(profile)
 
     def _hot(self, profile):
         today = date.today()
         days_ago = today - timedelta(days=3)
-        return self.get_queryset().filter(
+        return self._affinity(profile).filter(
             date__range=(days_ago, today)
-        ).filter(
-            tags__name__in=profile.questions.filter(
-                date__range=(days_ago, today)
-            ).values_list("tags__name", flat=True)
-        ).distinct()
+        ).order_by(*HOT_ORDER)
 
     def _week(self, profile):
         today = date.today()
         weekago = today - timedelta(days=7)
-        return self.get_queryset().filter(
+        return self._affinity(profile).filter(
             date__range=(weekago, today)
-        ).filter(
-            tags__name__in=profile.questions.values_list(
-                "tags__name", flat=True
-            )
-        ).distinct()
+        ).order_by(*HOT_ORDER)
 
     def _month(self, profile):
         today = date.today()
         monthago = today - timedelta(days=31)
-        return self.get_queryset().filter(
-            date__range=(monthago, today)
-        ).filter(
-            tags__name__in=profile.questions.values_list(
-                "tags__name", flat=True
-            )
-        ).distinct()
+        return self._affinity(profile).filter(date__range=(monthago, today))
+
+    def _affinity(self, profile):
+        '''Questions tagged with any tag the profile has shown an
+        interest in, read from the profile's stored tag affinities.'''
+        tag_ids = ProfileTagAffinity.objects.filter(
+            profile=profile, weight__gt=0
+        ).values("tag_id")
+        question_ids = Question.tags.through.objects.filter(
+            tag_id__in=tag_ids
+        ).values("question_id")
+        return self.get_queryset().filter(id__in=question_ids)
 
 
 class Tag(Model):
@@ -145,6 +243,8 @@ class Tag(Model):
 class Post(Model):
 
     body = TextField()
+    body_html = TextField(default="", editable=False)
+    body_hash = CharField(max_length=64, default="", editable=False)
     date = DateField(default=date.today)
     comment = ForeignKey('Comment', on_delete=CASCADE, null=True)
     profile = ForeignKey(
@@ -162,6 +262,12 @@ class Post(Model):
         abstract = True
         managed = True
 
+    @property
+    def live_score(self):
+        '''The stored score plus any votes still held in the score
+        buffer.'''
+        return self.score + score_buffer.pending(type(self), self.id)
+
 
 class Question(Post):
 
@@ -176,7 +282,9 @@ class Question(Post):
         'Tag', related_name="questions", related_query_name="question"
     )
     views = IntegerField(default=0)
-    objects = Manager()
+    answer_count = PositiveIntegerField(default=0, db_index=True)
+    hotness = FloatField(default=0)
+    objects = QuestionManager()
     postings = QuestionSearchManager()
     searches = QueryStringSearchManager()
 
@@ -187,6 +295,10 @@ class Question(Post):
         constraints = [UniqueConstraint(fields=[
             'title', 'date', 'profile'
         ], name="duplicated_post_by_date")]
+        indexes = [
+            Index(fields=list(LISTING_ORDER), name="question_listing_order"),
+            Index(fields=list(HOT_ORDER), name="question_hot_order")
+        ]
 
 
     def __repr__(self):
@@ -214,13 +326,47 @@ class Comment(Post):
 
 
 
+class VoteTypeField(SmallIntegerField):
+    '''Store a vote type name as a small integer code whose sign is the
+    direction of the vote. Names are converted in both directions, so
+    lookups and instances keep using "like", "up", "dislike" and "down".'''
+
+    CODES = {"up": 1, "like": 2, "down": -1, "dislike": -2}
+    NAMES = {code: name for name, code in CODES.items()}
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("choices", [(name, name) for name in self.CODES])
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs.pop("choices", None)
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        return self.NAMES.get(value, value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return self.NAMES[int(value)]
+
+    def get_prep_value(self, value):
+        if isinstance(value, str):
+            try:
+                return self.CODES[value]
+            except KeyError:
+                raise ValueError(f"Unknown vote type {value!r}")
+        return super().get_prep_value(value)
+
+
 class Vote(Model):
 
     profile = ForeignKey(
         'authors.Profile', on_delete=SET_NULL, null=True,
         related_name="votes"
     )
-    type = CharField(max_length=7)
+    type = VoteTypeField()
     content_type = ForeignKey(ContentType, on_delete=CASCADE)
     object_id = PositiveIntegerField()
     content_object = GenericForeignKey()
@@ -239,6 +385,9 @@ class Vote(Model):
     class Meta:
         managed = True
         db_table = "vote"
+        constraints = [UniqueConstraint(fields=[
+            'content_type', 'object_id', 'profile'
+        ], name="unique_post_vote")]
 
 
 class QuestionPageHit(Model):
@@ -246,6 +395,7 @@ class QuestionPageHit(Model):
     question = ForeignKey("Question", on_delete=CASCADE, related_name="_views")
     profile = ForeignKey(settings.AUTH_USER_MODEL, on_delete=SET_NULL, null=True)
     address = GenericIPAddressField()
+    timestamp = DateTimeField(default=timezone.now, db_index=True)
 
 
     class Meta:
@@ -253,6 +403,37 @@ class QuestionPageHit(Model):
         db_table = "questionpagehit"
 
 
+class QuestionViewRollup(Model):
+
+    question = ForeignKey("Question", on_delete=CASCADE, related_name="view_rollups")
+    day = DateField()
+    hits = PositiveIntegerField(default=0)
+    unique_viewers = PositiveIntegerField(default=0)
+    sketch = BinaryField()
+
+
+    class Meta:
+        managed = True
+        db_table = "questionviewrollup"
+        constraints = [UniqueConstraint(fields=[
+            'question', 'day'
+        ], name="unique_question_view_day")]
+
+
+class QuestionViewSketch(Model):
+
+    question = OneToOneField(
+        "Question", on_delete=CASCADE, primary_key=True,
+        related_name="view_sketch"
+    )
+    sketch = BinaryField()
+
+
+    class Meta:
+        managed = True
+        db_table = "questionviewsketch"
+
+
 class Bookmark(Model):
     question = ForeignKey("Question", on_delete=CASCADE, related_name="bookmarks")
     profile = ForeignKey(
@@ -263,3 +444,45 @@ class Bookmark(Model):
     class Meta:
         managed = True
         db_table = "bookmark"
+
+
+class IndexStamp(Model):
+
+    name = CharField(unique=True, max_length=25)
+    token = CharField(max_length=32)
+
+
+    class Meta:
+        managed = True
+        db_table = "indexstamp"
+
+
+class ListingCount(Model):
+
+    name = CharField(unique=True, max_length=40)
+    total = IntegerField(default=0)
+
+
+    class Meta:
+        managed = True
+        db_table = "listingcount"
+
+
+class ProfileTagAffinity(Model):
+
+    profile = ForeignKey(
+        "authors.Profile", on_delete=CASCADE, related_name="tag_affinities"
+    )
+    tag = ForeignKey("Tag", on_delete=CASCADE, related_name="affinities")
+    weight = IntegerField(default=0)
+
+
+    class Meta:
+        managed = True
+        db_table = "profiletagaffinity"
+        constraints = [UniqueConstraint(fields=[
+            'profile', 'tag'
+        ], name="unique_profile_tag_affinity")]
+        indexes = [
+            Index(fields=['profile', 'weight', 'tag'], name="profile_tag_affinity")
+        ]
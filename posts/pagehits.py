@@ -0,0 +1,292 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+
+from .hyperloglog import HyperLogLog
+from .models import (
+    Question, QuestionPageHit, QuestionViewSketch, QuestionViewRollup
+)
+
+PAGE_HIT_DEFAULTS = {
+    "PAGE_HIT_BUFFER_ENABLED": True,
+    "PAGE_HIT_INTERVAL": 5,
+    "PAGE_HIT_BUFFER_SIZE": 500,
+    "PAGE_HIT_WINDOW": 30 * 60,
+    "PAGE_HIT_RETENTION_DAYS": 30,
+    "VIEW_HISTORY_DAYS": 5 * 365,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def page_hit_setting(name):
+    '''Read a page hit setting when it is used rather than at import,
+    so that override_settings applies to it.'''
+    return getattr(settings, name, PAGE_HIT_DEFAULTS[name])
+
+
+class _Setting:
+    '''A PageHitBuffer attribute that follows a setting until it is
+    given a value of its own.'''
+
+    def __init__(self, name):
+        self.name = name
+
+    def __set_name__(self, owner, attribute):
+        self.attribute = f"_{attribute}"
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = instance.__dict__.get(self.attribute)
+        return page_hit_setting(self.name) if value is None else value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.attribute] = value
+
+
+class PageHitBuffer:
+    '''Collect question page hits in process memory and write them with
+    bulk inserts, dropping repeated hits on a question from the same
+    profile, or the same address when anonymous, within window seconds.
+
+    The buffer is flushed once max_hits hits have accumulated, every
+    interval seconds from a background timer, and when the process
+    exits. Those flushes log a failure and keep the hits for the next
+    one rather than failing the page view that triggered them.
+
+    Arguments left as None follow the PAGE_HIT_INTERVAL,
+    PAGE_HIT_BUFFER_SIZE and PAGE_HIT_WINDOW settings; an interval of 0
+    starts no timer.'''
+
+    interval = _Setting("PAGE_HIT_INTERVAL")
+    max_hits = _Setting("PAGE_HIT_BUFFER_SIZE")
+    window = _Setting("PAGE_HIT_WINDOW")
+
+    def __init__(self, interval=None, max_hits=None, window=None):
+        self.interval = interval
+        self.max_hits = max_hits
+        self.window = window
+        self._hits = []
+        self._seen = {}
+        self._pruned = time.monotonic()
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add(self, question_id, profile_id, address, timer=True):
+        '''Buffer a hit and return True, or return False if it repeats
+        a hit seen within the window. The flush timer is started unless
+        timer is False.'''
+        key = (question_id, viewer_key(profile_id, address))
+        now = time.monotonic()
+        with self._lock:
+            last = self._seen.get(key)
+            if last is not None and now - last < self.window:
+                return False
+            self._seen[key] = now
+            self._prune(now)
+            self._hits.append(QuestionPageHit(
+                question_id=question_id, profile_id=profile_id, address=address
+            ))
+            full = len(self._hits) >= self.max_hits
+            if not full and timer and self.interval and self._timer is None:
+                self._timer = threading.Timer(self.interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush_logged()
+        return True
+
+    def pending(self):
+        return len(self._hits)
+
+    def flush(self):
+        '''Bulk insert every buffered hit on a question that still
+        exists and return the number written. Hits are put back if the
+        write fails. The viewers of the written hits are folded into
+        their questions' view counts.'''
+        with self._lock:
+            hits, self._hits = self._hits, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not hits:
+            return 0
+        existing = set(Question.objects.filter(
+            id__in={hit.question_id for hit in hits}
+        ).values_list("id", flat=True))
+        hits = [hit for hit in hits if hit.question_id in existing]
+        try:
+            with transaction.atomic():
+                QuestionPageHit.objects.bulk_create(hits, batch_size=self.max_hits)
+                fold_viewers(hits)
+        except Exception:
+            with self._lock:
+                self._hits[:0] = hits
+            raise
+        return len(hits)
+
+    def flush_logged(self):
+        try:
+            return self.flush()
+        except Exception:
+            logger.exception("Could not write %d page hits", self.pending())
+            return 0
+
+    def _prune(self, now):
+        # Called with the lock held; forgets viewers whose window ended.
+        if now - self._pruned < self.window:
+            return
+        self._seen = {
+            key: seen for key, seen in self._seen.items()
+            if now - seen < self.window
+        }
+        self._pruned = now
+
+    def _flush_on_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush_logged()
+        finally:
+            close_old_connections()
+
+
+def viewer_key(profile_id, address):
+    return f"profile:{profile_id}" if profile_id else f"address:{address}"
+
+
+def fold_viewers(hits):
+    '''Add the viewers of hits to the HyperLogLog sketch of each
+    question they viewed and store the sketch's estimate of its unique
+    viewers in Question.views. Sketches are locked while merged, so
+    processes flushing hits on the same question do not lose viewers.'''
+    viewers = {}
+    for hit in hits:
+        viewers.setdefault(hit.question_id, set()).add(
+            viewer_key(hit.profile_id, hit.address)
+        )
+    with transaction.atomic():
+        stored = {
+            row.question_id: row for row in
+            QuestionViewSketch.objects.select_for_update().filter(
+                question_id__in=viewers
+            )
+        }
+        views, created = {}, []
+        for question_id, keys in viewers.items():
+            row = stored.get(question_id)
+            if row is None:
+                sketch = HyperLogLog()
+                row = QuestionViewSketch(question_id=question_id)
+                created.append(row)
+            else:
+                sketch = HyperLogLog.from_bytes(row.sketch)
+            for key in keys:
+                sketch.add(key)
+            row.sketch = sketch.to_bytes()
+            views[question_id] = sketch.count()
+        if stored:
+            QuestionViewSketch.objects.bulk_update(stored.values(), ["sketch"])
+        if created:
+            QuestionViewSketch.objects.bulk_create(created)
+        Question.objects.filter(id__in=views).update(views=Case(
+            *[When(id=question_id, then=Value(count)) for question_id, count in views.items()],
+            default=Value(0), output_field=IntegerField()
+        ))
+
+
+def _roll_up(hits):
+    '''Add (question_id, profile_id, address, timestamp) hits to the
+    daily rollups of their questions, merging viewers into each day's
+    sketch so that compacting a day in several batches does not count
+    a viewer twice.'''
+    days = {}
+    for question_id, profile_id, address, timestamp in hits:
+        key = (question_id, timezone.localdate(timestamp))
+        count, sketch = days.get(key) or (0, HyperLogLog())
+        sketch.add(viewer_key(profile_id, address))
+        days[key] = (count + 1, sketch)
+    stored = {
+        (row.question_id, row.day): row for row in
+        QuestionViewRollup.objects.select_for_update().filter(
+            question_id__in={question_id for question_id, day in days},
+            day__in={day for question_id, day in days}
+        )
+    }
+    created = []
+    for (question_id, day), (count, sketch) in days.items():
+        row = stored.get((question_id, day))
+        if row is None:
+            row = QuestionViewRollup(question_id=question_id, day=day)
+            created.append(row)
+        else:
+            sketch.merge(HyperLogLog.from_bytes(row.sketch))
+        row.hits += count
+        row.unique_viewers = sketch.count()
+        row.sketch = sketch.to_bytes()
+    if stored:
+        QuestionViewRollup.objects.bulk_update(
+            stored.values(), ["hits", "unique_viewers", "sketch"]
+        )
+    if created:
+        QuestionViewRollup.objects.bulk_create(created)
+
+
+def compact_page_hits(before, batch_size=1000):
+    '''Roll the hits recorded before the given time into daily
+    QuestionViewRollup rows and delete them, oldest first, batch_size
+    hits per transaction so that no write lock is held for longer than
+    one batch takes. Returns the number of hits compacted.'''
+    compacted = 0
+    while True:
+        with transaction.atomic():
+            batch = list(QuestionPageHit.objects.filter(
+                timestamp__lt=before
+            ).order_by("id").values_list(
+                "id", "question_id", "profile_id", "address", "timestamp"
+            )[:batch_size])
+            if not batch:
+                return compacted
+            _roll_up([hit[1:] for hit in batch])
+            # The batch is exactly the old hits up to its last id.
+            QuestionPageHit.objects.filter(
+                timestamp__lt=before, id__lte=batch[-1][0]
+            ).delete()
+        compacted += len(batch)
+
+
+def view_history(question_id, since=None):
+    '''Return the question's daily (day, hits, unique_viewers) from the
+    rollups, oldest first.'''
+    rollups = QuestionViewRollup.objects.filter(question_id=question_id)
+    if since is not None:
+        rollups = rollups.filter(day__gte=since)
+    return list(rollups.order_by("day").values_list(
+        "day", "hits", "unique_viewers"
+    ))
+
+
+page_hits = PageHitBuffer()
+atexit.register(page_hits.flush)
+
+
+def record_page_hit(request, question_id):
+    '''Record a view of the question's page by the requesting user or
+    address. Unless PAGE_HIT_BUFFER_ENABLED is set, a hit that is not a
+    repeat is written straight away; a failed write is logged, not
+    raised.'''
+    address = request.META.get("REMOTE_ADDR")
+    if not address:
+        return
+    user = request.user
+    profile_id = user.id if user.is_authenticated else None
+    buffered = page_hit_setting("PAGE_HIT_BUFFER_ENABLED")
+    if page_hits.add(question_id, profile_id, address, timer=buffered) and not buffered:
+        page_hits.flush_logged()
@@ -0,0 +1,147 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+LISTING_ORDER = ("-date", "views", "-score", "id")
+HOT_ORDER = ("-hotness", "date", "id")
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(direction, values):
+    data = json.dumps([direction, *values], default=str, separators=(",", ":"))
+    return urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padding = "=" * (-len(token) % 4)
+        direction, *values = json.loads(urlsafe_b64decode(token + padding))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor(token)
+    if direction not in ("after", "before"):
+        raise InvalidCursor(token)
+    return direction, values
+
+
+def seek(ordering, values, direction):
+    '''Build the row-value comparison `(a, b, ...) > (x, y, ...)` for an
+    ordering that mixes ascending and descending fields.'''
+    condition = Q()
+    equal_prefix = {}
+    for field, value in zip(ordering, values):
+        descending = field.startswith("-")
+        name = field.lstrip("-")
+        lookup = "lt" if descending == (direction == "after") else "gt"
+        condition |= Q(**equal_prefix, **{f"{name}__{lookup}": value})
+        equal_prefix[name] = value
+    return condition
+
+
+def reverse_ordering(ordering):
+    return tuple(
+        field[1:] if field.startswith("-") else f"-{field}" for field in ordering
+    )
+
+
+class KeysetPage:
+
+    number = None
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return self.paginator.cursor_for(self.object_list[-1], "after")
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return self.paginator.cursor_for(self.object_list[0], "before")
+
+
+class KeysetPaginator:
+    '''Seek through a queryset in listing order using the last row
+    of a page as the start of the next, so that a page deep into a
+    listing costs the same index range scan as the first page. The
+    ordering defaults to the queryset's own.'''
+
+    def __init__(self, queryset, per_page, ordering=None, count=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering or queryset.query.order_by or LISTING_ORDER)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        if self._count is not None:
+            return self._count()
+        return self.queryset.count()
+
+    def cursor_for(self, obj, direction):
+        values = [getattr(obj, field.lstrip("-")) for field in self.ordering]
+        return encode_cursor(direction, values)
+
+    def decode(self, cursor):
+        direction, values = decode_cursor(cursor)
+        if len(values) != len(self.ordering) or None in values:
+            raise InvalidCursor(cursor)
+        fields = [
+            self.queryset.model._meta.get_field(field.lstrip("-"))
+            for field in self.ordering
+        ]
+        try:
+            return direction, [
+                field.to_python(value) for field, value in zip(fields, values)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+
+    def get_page(self, cursor=None):
+        '''Return the page following (or preceding) the row encoded in
+        cursor; a missing or malformed cursor, or one past which no rows
+        are left, yields the first page.'''
+        try:
+            direction, values = self.decode(cursor) if cursor else (None, None)
+        except InvalidCursor:
+            direction = values = None
+        if direction is not None:
+            ordering = self.ordering
+            if direction == "before":
+                ordering = reverse_ordering(ordering)
+            rows = list(self.queryset.filter(
+                seek(self.ordering, values, direction)
+            ).order_by(*ordering)[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            if rows and direction == "after":
+                return KeysetPage(rows, self, has_more, True)
+            if rows:
+                return KeysetPage(rows[::-1], self, True, has_more)
+        rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+        return KeysetPage(
+            rows[:self.per_page], self, len(rows) > self.per_page, False
+        )
@@ -0,0 +1,36 @@
+from hashlib import sha256
+
+from .markdown import MARKDOWN_VERSION, render_markdown
+from .models import Question, Answer, Comment
+
+RENDERED_MODELS = {"question": Question, "answer": Answer, "comment": Comment}
+
+
+def body_hash(body):
+    '''Hash a post body together with the renderer version, so that
+    stored HTML goes stale when either changes.'''
+    return sha256(f"{MARKDOWN_VERSION}\n{body}".encode()).hexdigest()
+
+
+def render_post(post, force=False):
+    '''Render the post's body into body_html unless the stored HTML was
+    rendered from the same body by the same renderer. Returns whether
+    it was rendered.'''
+    digest = body_hash(post.body)
+    if digest == post.body_hash and not force:
+        return False
+    post.body_html = render_markdown(post.body)
+    post.body_hash = digest
+    return True
+
+
+def render_chunk(model_name, low, high, force=False):
+    '''Re-render the stale bodies of the posts with ids in [low, high)
+    and return (checked, rendered).'''
+    model = RENDERED_MODELS[model_name]
+    posts = list(model.objects.filter(id__gte=low, id__lt=high).only(
+        "id", "body", "body_hash"
+    ))
+    rendered = [post for post in posts if render_post(post, force)]
+    model.objects.bulk_update(rendered, ["body_html", "body_hash"], batch_size=500)
+    return len(posts), len(rendered)
@@ -0,0 +1,114 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from . import caching
+
+SCORE_BUFFER_ENABLED = getattr(settings, "SCORE_BUFFER_ENABLED", False)
+SCORE_BUFFER_INTERVAL = getattr(settings, "SCORE_BUFFER_INTERVAL", 0.5)
+SCORE_BUFFER_SIZE = getattr(settings, "SCORE_BUFFER_SIZE", 100)
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreBuffer:
+    '''Coalesce score deltas per post in process memory and write them
+    with one UPDATE per model, so that a stream of votes on a popular
+    post takes the database write lock once per flush instead of once
+    per vote.
+
+    The buffer is flushed once max_votes deltas have accumulated, every
+    interval seconds from a background timer, and when the process
+    exits. Those flushes log a failure and keep the deltas for the next
+    one rather than failing the already committed vote that triggered
+    them.'''
+
+    def __init__(self, interval=SCORE_BUFFER_INTERVAL, max_votes=SCORE_BUFFER_SIZE):
+        self.interval = interval
+        self.max_votes = max_votes
+        self._pending = {}
+        self._votes = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add(self, model, post_id, delta):
+        with self._lock:
+            key = (model, post_id)
+            self._pending[key] = self._pending.get(key, 0) + delta
+            self._votes += 1
+            full = self._votes >= self.max_votes
+            if not full and self.interval and self._timer is None:
+                self._timer = threading.Timer(self.interval, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush_logged()
+
+    def pending(self, model, post_id):
+        return self._pending.get((model, post_id), 0)
+
+    def flush(self):
+        '''Write every pending delta, one UPDATE ... CASE statement per
+        model, and return the number of posts updated. Deltas are put
+        back if the write fails. Cached pages and score-filtered listings
+        showing the updated scores are expired once they are written.'''
+        with self._lock:
+            pending, self._pending, self._votes = self._pending, {}, 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        by_model = {}
+        for (model, post_id), delta in pending.items():
+            if delta:
+                by_model.setdefault(model, {})[post_id] = delta
+        question_ids = set()
+        try:
+            with transaction.atomic():
+                for model, deltas in by_model.items():
+                    model.objects.filter(id__in=deltas).update(score=F("score") + Case(
+                        *[When(id=post_id, then=Value(delta)) for post_id, delta in deltas.items()],
+                        default=Value(0), output_field=IntegerField()
+                    ))
+                    question_ids.update(_question_ids(model, deltas))
+        except Exception:
+            with self._lock:
+                for key, delta in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + delta
+            raise
+        if by_model:
+            caching.bump_score_version()
+        for question_id in question_ids:
+            caching.bump_question_version(question_id)
+        return sum(len(deltas) for deltas in by_model.values())
+
+    def flush_logged(self):
+        try:
+            return self.flush()
+        except Exception:
+            logger.exception("Could not write %d buffered scores", len(self._pending))
+            return 0
+
+    def _flush_on_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush_logged()
+        finally:
+            close_old_connections()
+
+
+def _question_ids(model, post_ids):
+    # Answers' scores are shown on, and cached with, their question.
+    if any(field.name == "question" for field in model._meta.fields):
+        return model.objects.filter(id__in=post_ids).values_list(
+            "question_id", flat=True
+        )
+    return post_ids
+
+
+score_buffer = ScoreBuffer()
+atexit.register(score_buffer.flush)
@@ -0,0 +1,88 @@
+import re
+from functools import reduce
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FULLTEXT_TABLE = "question_fts"
+RANKING = f"bm25({FULLTEXT_TABLE}, 10.0, 1.0)"
+
+word_pattern = re.compile(r"\w+")
+
+
+def fulltext_enabled():
+    '''The FTS5 index only exists on the SQLite backend; other
+    backends fall back to case-insensitive title lookups.'''
+    return connection.vendor == "sqlite"
+
+
+def index_question(question):
+    if not fulltext_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FULLTEXT_TABLE} WHERE rowid = %s", [question.id]
+        )
+        cursor.execute(
+            f"INSERT INTO {FULLTEXT_TABLE} (rowid, title, body) "
+            "VALUES (%s, %s, %s)", [question.id, question.title, question.body]
+        )
+
+
+def unindex_question(question_id):
+    if not fulltext_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FULLTEXT_TABLE} WHERE rowid = %s", [question_id]
+        )
+
+
+def rebuild_index():
+    if not fulltext_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FULLTEXT_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FULLTEXT_TABLE} (rowid, title, body) "
+            "SELECT id, title, body FROM question"
+        )
+        cursor.execute(f"SELECT COUNT(*) FROM {FULLTEXT_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def match_expression(terms, phrases=()):
+    '''Every term of the search must be present in either the title
+    or the body of a question. Words are quoted so that FTS5 syntax
+    characters are taken literally and matched as prefixes; phrases
+    must appear verbatim.'''
+    words = [word for term in terms for word in word_pattern.findall(term)]
+    quoted = [phrase.replace('"', '""') for phrase in phrases]
+    if not words and not quoted:
+        return None
+    return " ".join(
+        [f'"{word}"*' for word in words] + [f'"{phrase}"' for phrase in quoted]
+    )
+
+
+def search(queryset, terms, phrases=()):
+    '''Narrow a Question queryset to the rows matching the search
+    terms and annotate each with its BM25 `rank` (lower is better).'''
+    expression = match_expression(terms, phrases)
+    if expression is None:
+        return queryset
+    if not fulltext_enabled():
+        words = [word for term in terms for word in word_pattern.findall(term)]
+        q_objects = map(
+            lambda text: Q(title__icontains=text), words + list(phrases)
+        )
+        return queryset.filter(reduce(lambda q1, q2: q1 & q2, q_objects))
+    return queryset.filter(id__in=RawSQL(
+        f"SELECT rowid FROM {FULLTEXT_TABLE} "
+        f"WHERE {FULLTEXT_TABLE} MATCH %s", (expression, )
+    )).annotate(rank=RawSQL(
+        f"SELECT {RANKING} FROM {FULLTEXT_TABLE} "
+        f"WHERE {FULLTEXT_TABLE} MATCH %s AND rowid = question.id",
+        (expression, )
+    ))
@@ -1,16 +1,20 @@
 
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import F
 from django.contrib.auth import get_user_model
 
 from .models import Vote, Question, Answer
+from . import votes
 
-from rest_framework.serializers import ModelSerializer, BaseSerializer
+from rest_framework.serializers import (
+    ModelSerializer, BaseSerializer, Serializer, ChoiceField, IntegerField
+)
 from rest_framework.exceptions import ValidationError
 
 
 class VoteSerializer(ModelSerializer):
 
+    type = ChoiceField(choices=votes.VOTE_TYPES)
+
     def validate_profile(self, value):
         if self.context['post'].profile.id == value.id:
             raise ValidationError("You cannot vote on your post")
@@ -18,24 +22,22 @@ class VoteSerializer(ModelSerializer):
 
     def create(self, validated_data):
         post = self.context['post']
-        if self.context['vote_type'] == "dislike":
-            post.score = F("score") - 1
-        else:
-            post.score = F("score") + 1
-        post.save()
-        post.refresh_from_db()
-        return self.Meta.model.objects.create(**validated_data)
+        change = votes.cast_vote(
+            validated_data['profile'], post, validated_data['type']
+        )
+        if not change.delta:
+            raise ValidationError("You have already voted on this post")
+        self.context['score_delta'] = change.delta
+        if change.vote is None:
+            return votes.post_votes(validated_data['profile'], post).get()
+        return change.vote
 
     def update(self, instance, validated_data):
+        change = votes.switch_vote(
+            instance.profile, self.context['post'], validated_data['type']
+        )
+        self.context['score_delta'] = change.delta
         instance.type = validated_data['type']
-        instance.save()
-        post = self.context['post']
-        if validated_data['type'] == "dislike":
-            post.score = F("score") - 2
-        else:
-            post.score = F("score") + 2
-        post.save()
-        post.refresh_from_db()
         return instance
 
 
@@ -44,35 +46,33 @@ class VoteSerializer(ModelSerializer):
         fields = ['type', 'profile']
 
 
+class VoteOperationSerializer(Serializer):
+
+    post = ChoiceField(choices=list(votes.VOTE_MODELS))
+    id = IntegerField(min_value=1)
+    type = ChoiceField(choices=votes.VOTE_TYPES)
+    op = ChoiceField(choices=["cast", "switch", "retract"])
+
+
 class CurrentPostStateSerializer(BaseSerializer):
 
     def to_representation(self, instance):
         if isinstance(self.context['request'].user, get_user_model()):
             user_profile = self.context['request'].user.profile
-            question_voted_on = instance.vote.filter(
-                profile=user_profile
-            ).exists()
-            answers_voted_on = instance.answers.exclude(
-                profile=user_profile
-            ).filter(vote__profile=user_profile)
-            is_bookmarked = instance.bookmarks.filter(
-                profile=user_profile
-            ).exists()
+            state = votes.load_vote_state(user_profile, instance.id)
+            question_key = votes.post_key("question", instance.id)
+            answers = sorted(
+                (int(key.split("_")[1]), type)
+                for key, type in state.votes.items() if key != question_key
+            )
             data = {
                 "question_id": instance.id,
-                "vote": question_voted_on,
-                "bookmark": is_bookmarked,
+                "vote": state.votes.get(question_key, False),
+                "bookmark": state.bookmarked,
                 "answers": [
-                    {"id": answer.id, "vote": answer.vote.get(
-                        profile=user_profile
-                    ).type}
-                    for answer in answers_voted_on
-                ] if answers_voted_on else None
+                    {"id": answer_id, "vote": type} for answer_id, type in answers
+                ] or None
             }
-            if user_profile == instance.profile:
+            if user_profile.id == instance.profile_id:
                 data.update({"vote": False})
-            elif question_voted_on:
-                data.update({
-                    "vote": instance.vote.get(profile=user_profile).type
-                })
             return data
@@ -0,0 +1,211 @@
+from datetime import date
+from functools import partial
+
+from django.db.models.signals import (
+    pre_save, post_save, pre_delete, post_delete, m2m_changed
+)
+from django.db import transaction
+from django.dispatch import receiver
+
+from .models import Question, Answer, Comment, Tag, Bookmark
+from .tagindex import tag_index, tag_completion
+from . import affinity, caching, counts, hotness, search
+from .rendering import render_post
+
+
+@receiver(pre_save, sender=Question)
+@receiver(pre_save, sender=Answer)
+@receiver(pre_save, sender=Comment)
+def render_post_body(sender, instance, raw, update_fields, **kwargs):
+    if not raw and (update_fields is None or "body" in update_fields):
+        render_post(instance)
+
+
+@receiver(pre_save, sender=Question)
+def score_new_question(sender, instance, raw, **kwargs):
+    if instance._state.adding and not raw:
+        instance.hotness = hotness.hot_score(
+            instance.score, instance.answer_count, instance.views,
+            (date.today() - instance.date).days
+        )
+
+
+@receiver(post_save, sender=Question)
+def index_saved_question(sender, instance, created, **kwargs):
+    search.index_question(instance)
+    caching.bump_listing_version()
+    caching.bump_question_version(instance.id)
+    if created:
+        counts.adjust_counters({counts.QUESTIONS: 1, counts.UNANSWERED: 1})
+
+
+@receiver(pre_delete, sender=Question)
+def uncount_deleted_question(sender, instance, **kwargs):
+    stored = Question.objects.filter(id=instance.id).values_list(
+        "answer_count", flat=True
+    ).first() or 0
+    # The cascaded answers are deleted after this, and the one that
+    # brings answer_count to zero moves the question from answered to
+    # unanswered itself; only the question's final tab is decremented.
+    answered = stored - Answer.objects.filter(question_id=instance.id).count() > 0
+    deltas = {
+        counts.QUESTIONS: -1,
+        counts.ANSWERED if answered else counts.UNANSWERED: -1
+    }
+    tag_ids = affinity.question_tag_ids(instance.id)
+    for tag_id in tag_ids:
+        deltas[counts.tag_counter(tag_id)] = -1
+    counts.adjust_counters(deltas)
+    affinity.adjust_profile_affinity(
+        instance.profile_id, tag_ids, -affinity.ASK_WEIGHT
+    )
+
+
+@receiver(post_delete, sender=Question)
+def unindex_deleted_question(sender, instance, **kwargs):
+    search.unindex_question(instance.id)
+    tag_index.invalidate()
+    transaction.on_commit(tag_completion.rebuild)
+    caching.bump_listing_version()
+    caching.bump_question_version(instance.id)
+
+
+@receiver(m2m_changed, sender=Question.tags.through)
+def expire_retagged_question_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        question_ids = list(instance.questions.values_list("id", flat=True))
+    elif reverse and action in ("post_add", "post_remove"):
+        question_ids = pk_set or ()
+    elif not reverse and action in ("post_add", "post_remove", "post_clear"):
+        question_ids = [instance.id]
+    else:
+        return
+    for question_id in question_ids:
+        caching.bump_question_version(question_id)
+
+
+@receiver(m2m_changed, sender=Question.tags.through)
+def update_tag_postings(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        caching.bump_listing_version()
+    if action == "pre_clear":
+        tag_ids = [instance.id] if reverse else instance.tags.values_list("id", flat=True)
+        total = instance.questions.count() if reverse else 1
+        counts.adjust_counters({
+            counts.tag_counter(tag_id): -total for tag_id in tag_ids
+        })
+    elif action in ("post_add", "post_remove") and pk_set:
+        delta = 1 if action == "post_add" else -1
+        if reverse:
+            counts.adjust_counters({
+                counts.tag_counter(instance.id): delta * len(pk_set)
+            })
+        else:
+            counts.adjust_counters({
+                counts.tag_counter(tag_id): delta for tag_id in pk_set
+            })
+    update_asker_affinity(instance, action, reverse, pk_set)
+    if action == "post_clear":
+        tag_index.invalidate()
+        transaction.on_commit(tag_completion.rebuild)
+    elif action in ("post_add", "post_remove") and pk_set:
+        if reverse:
+            question_ids, names = pk_set, [instance.name] * len(pk_set)
+        else:
+            question_ids = [instance.id]
+            names = list(Tag.objects.filter(pk__in=pk_set).values_list(
+                "name", flat=True
+            ))
+        if action == "post_add":
+            tag_index.add(question_ids, set(names))
+            transaction.on_commit(partial(tag_completion.adjust, names, 1))
+        else:
+            tag_index.remove(question_ids, set(names))
+            transaction.on_commit(partial(tag_completion.adjust, names, -1))
+
+
+def update_asker_affinity(instance, action, reverse, pk_set):
+    if action == "pre_clear":
+        delta = -affinity.ASK_WEIGHT
+        if reverse:
+            pairs = instance.questions.values_list("profile_id", flat=True)
+            pairs = [(profile_id, instance.id) for profile_id in pairs]
+        else:
+            pairs = [
+                (instance.profile_id, tag_id)
+                for tag_id in affinity.question_tag_ids(instance.id)
+            ]
+    elif action in ("post_add", "post_remove") and pk_set:
+        delta = affinity.ASK_WEIGHT if action == "post_add" else -affinity.ASK_WEIGHT
+        if reverse:
+            pairs = Question.objects.filter(id__in=pk_set).values_list(
+                "profile_id", flat=True
+            )
+            pairs = [(profile_id, instance.id) for profile_id in pairs]
+        else:
+            pairs = [(instance.profile_id, tag_id) for tag_id in pk_set]
+    else:
+        return
+    deltas = {}
+    for pair in pairs:
+        deltas[pair] = deltas.get(pair, 0) + delta
+    affinity.adjust_affinity(deltas)
+
+
+@receiver(post_save, sender=Tag)
+def reindex_renamed_tag(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(tag_completion.add, instance.name))
+    else:
+        tag_index.invalidate()
+        transaction.on_commit(tag_completion.rebuild)
+        caching.bump_listing_version()
+        for question_id in instance.questions.values_list("id", flat=True):
+            caching.bump_question_version(question_id)
+
+
+@receiver(post_delete, sender=Tag)
+def uncomplete_deleted_tag(sender, instance, **kwargs):
+    transaction.on_commit(tag_completion.rebuild)
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def expire_answered_listings(sender, instance, **kwargs):
+    caching.bump_listing_version()
+    caching.bump_question_version(instance.question_id)
+
+
+@receiver(post_save, sender=Bookmark)
+@receiver(post_delete, sender=Bookmark)
+def expire_bookmarked_question(sender, instance, **kwargs):
+    caching.bump_question_version(instance.question_id)
+
+
+@receiver(post_save, sender=Answer)
+def count_saved_answer(sender, instance, created, **kwargs):
+    if created and counts.adjust_answer_count(instance.question_id, 1) == 1:
+        counts.adjust_counters({counts.ANSWERED: 1, counts.UNANSWERED: -1})
+
+
+@receiver(post_delete, sender=Answer)
+def count_deleted_answer(sender, instance, **kwargs):
+    if counts.adjust_answer_count(instance.question_id, -1) == 0:
+        counts.adjust_counters({counts.ANSWERED: -1, counts.UNANSWERED: 1})
+
+
+@receiver(post_save, sender=Answer)
+def credit_answerer_affinity(sender, instance, created, **kwargs):
+    if created:
+        affinity.adjust_profile_affinity(
+            instance.profile_id, affinity.question_tag_ids(instance.question_id),
+            affinity.ANSWER_WEIGHT
+        )
+
+
+@receiver(pre_delete, sender=Answer)
+def debit_answerer_affinity(sender, instance, **kwargs):
+    affinity.adjust_profile_affinity(
+        instance.profile_id, affinity.question_tag_ids(instance.question_id),
+        -affinity.ANSWER_WEIGHT
+    )
@@ -65,3 +65,29 @@ post_content_body.addEventListener("keyup", (event) => {
   );
   post_preview.innerHTML = marked_post_content;
 })
+
+let tag_suggestions = document.createElement("datalist");
+tag_suggestions.id = "tag_suggestions";
+document.body.appendChild(tag_suggestions);
+
+post_tag_inputs.forEach((tag_input) => {
+  tag_input.setAttribute("list", tag_suggestions.id);
+  tag_input.setAttribute("autocomplete", "off");
+  tag_input.addEventListener("input", async function(event) {
+    if (!this.value) {
+      return;
+    }
+    const params = new URLSearchParams({"prefix": this.value});
+    const response = await fetch(`/api/v1/tags/complete?${params}`);
+    if (!response.ok) {
+      return;
+    }
+    const tags = await response.json();
+    tag_suggestions.replaceChildren(...tags.map((tag) => {
+      const option = document.createElement("option");
+      option.value = tag.name;
+      option.textContent = `${tag.questions} question${tag.questions === 1 ? "" : "s"}`;
+      return option;
+    }));
+  })
+})
@@ -0,0 +1,235 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+import heapq
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+TAG_COMPLETION_REFRESH = getattr(settings, "TAG_COMPLETION_REFRESH", 300)
+TAG_COMPLETION_LIMIT = 20
+TAG_COMPLETION_MEMO_SIZE = getattr(settings, "TAG_COMPLETION_MEMO_SIZE", 1024)
+
+logger = logging.getLogger(__name__)
+
+
+def intersect_postings(postings):
+    '''Intersect sorted integer arrays, smallest first, advancing a
+    binary search cursor through each larger array.'''
+    postings = sorted(postings, key=len)
+    if not postings or not postings[0]:
+        return []
+    shortest, others = postings[0], postings[1:]
+    cursors = [0] * len(others)
+    matches = []
+    for question_id in shortest:
+        for i, posting in enumerate(others):
+            cursors[i] = bisect_left(posting, question_id, cursors[i])
+            if cursors[i] == len(posting):
+                return matches
+            if posting[cursors[i]] != question_id:
+                break
+        else:
+            matches.append(question_id)
+    return matches
+
+
+class TagPostingIndex:
+    '''An in-process map of each tag name to the sorted ids of the
+    questions carrying that tag.
+
+    The index is stamped with a token kept in the database. Local
+    changes swap the token atomically (compare-and-set) and are applied
+    in place; if the stored token no longer matches, whether because
+    another process changed the tags or a transaction was rolled back,
+    the index is rebuilt on the next read.'''
+
+    def __init__(self, name="tag_postings"):
+        self.name = name
+        self._postings = {}
+        self._token = None
+        self._lock = threading.RLock()
+
+    def _stamp(self, expected=None):
+        from .models import IndexStamp
+        token = uuid.uuid4().hex
+        swapped = expected is not None and IndexStamp.objects.filter(
+            name=self.name, token=expected
+        ).update(token=token)
+        if not swapped:
+            IndexStamp.objects.update_or_create(
+                name=self.name, defaults={'token': token}
+            )
+        return token, bool(swapped)
+
+    def _stored_token(self):
+        from .models import IndexStamp
+        return IndexStamp.objects.filter(name=self.name).values_list(
+            "token", flat=True
+        ).first()
+
+    def rebuild(self, token=None):
+        from .models import Question
+        with self._lock:
+            if token is None:
+                token = self._stored_token() or self._stamp()[0]
+            postings = {}
+            rows = Question.tags.through.objects.order_by(
+                "question_id"
+            ).values_list("tag__name", "question_id")
+            for name, question_id in rows.iterator():
+                postings.setdefault(name.lower(), array("q")).append(question_id)
+            self._postings, self._token = postings, token
+            return postings
+
+    def invalidate(self):
+        with self._lock:
+            self._stamp()
+            self._token = None
+
+    def question_ids(self, names):
+        with self._lock:
+            token = self._stored_token()
+            if token is None or token != self._token:
+                self.rebuild(token)
+            return intersect_postings([
+                self._postings.get(name.lower(), array("q")) for name in names
+            ])
+
+    def add(self, question_ids, names):
+        self._update(question_ids, names, self._insert)
+
+    def remove(self, question_ids, names):
+        self._update(question_ids, names, self._delete)
+
+    def _update(self, question_ids, names, operation):
+        with self._lock:
+            self._token, current = self._stamp(self._token)
+            if not current:
+                self._token = None
+                return
+            for name in names:
+                posting = self._postings.setdefault(name.lower(), array("q"))
+                for question_id in question_ids:
+                    operation(posting, question_id)
+
+    @staticmethod
+    def _insert(posting, question_id):
+        i = bisect_left(posting, question_id)
+        if i == len(posting) or posting[i] != question_id:
+            posting.insert(i, question_id)
+
+    @staticmethod
+    def _delete(posting, question_id):
+        i = bisect_left(posting, question_id)
+        if i < len(posting) and posting[i] == question_id:
+            del posting[i]
+
+
+class TagCompletionIndex:
+    '''Lowercased tag names kept in a sorted array, so that the tags
+    starting with a prefix form one slice found by bisection, ranked
+    by the number of questions carrying each tag.
+
+    Completions are answered from memory and never query the database.
+    The index is loaded by a background timer, first when it is asked
+    for and then every TAG_COMPLETION_REFRESH seconds to pick up other
+    processes' changes; until the first load it completes nothing.
+    Changes committed by this process are applied in place, or rebuild
+    the index once committed. The rankings of the memo_size most
+    recently completed prefixes are kept.'''
+
+    def __init__(self, refresh=TAG_COMPLETION_REFRESH, memo_size=TAG_COMPLETION_MEMO_SIZE):
+        self.refresh = refresh
+        self.memo_size = memo_size
+        self._keys = []
+        self._tags = {}
+        self._ranked = OrderedDict()
+        self._loaded_at = None
+        self._timer = None
+        self._lock = threading.RLock()
+
+    def rebuild(self):
+        '''Reload every tag and its question count, then schedule the
+        next reload.'''
+        from django.db.models import Count
+        from .models import Tag
+        rows = Tag.objects.annotate(total=Count("question")).values_list(
+            "name", "total"
+        )
+        tags = {name.lower(): [name, total] for name, total in rows}
+        with self._lock:
+            self._tags = tags
+            self._keys = sorted(tags)
+            self._ranked.clear()
+            self._loaded_at = time.monotonic()
+            if self.refresh:
+                self._schedule(self.refresh)
+
+    def _schedule(self, delay):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._rebuild_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _rebuild_on_timer(self):
+        from django.db import close_old_connections
+        with self._lock:
+            self._timer = None
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Could not rebuild the tag completion index")
+            self._schedule(self.refresh)
+        finally:
+            close_old_connections()
+
+    def complete(self, prefix, limit=10):
+        '''Return up to limit (name, question count) pairs for the tags
+        starting with prefix, most used first.'''
+        key = prefix.strip().lower()
+        with self._lock:
+            if self._loaded_at is None:
+                if self._timer is None:
+                    self._schedule(0)
+                return []
+            ranked = self._ranked.get(key)
+            if ranked is not None:
+                self._ranked.move_to_end(key)
+            else:
+                start = bisect_left(self._keys, key)
+                end = bisect_left(self._keys, key + "\U0010ffff", start)
+                ranked = tuple(heapq.nsmallest(
+                    TAG_COMPLETION_LIMIT, self._keys[start:end],
+                    key=lambda name: (-self._tags[name][1], name)
+                ))
+                self._ranked[key] = ranked
+                if len(self._ranked) > self.memo_size:
+                    self._ranked.popitem(last=False)
+            return [tuple(self._tags[name]) for name in ranked[:limit]]
+
+    def add(self, name):
+        key = name.lower()
+        with self._lock:
+            if self._loaded_at is None or key in self._tags:
+                return
+            self._tags[key] = [name, 0]
+            insort(self._keys, key)
+            self._ranked.clear()
+
+    def adjust(self, names, delta):
+        with self._lock:
+            for name in names:
+                tag = self._tags.get(name.lower())
+                if tag is not None:
+                    tag[1] = max(tag[1] + delta, 0)
+            self._ranked.clear()
+
+
+tag_index = TagPostingIndex()
+tag_completion = TagCompletionIndex()
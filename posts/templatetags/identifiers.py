@@ -1,13 +1,16 @@
 from urllib.parse import quote
-import re
 
+from django.core.cache import cache
 from django.http import QueryDict
 from django import template
+from django.template.loader import render_to_string
 from django.urls import resolve, reverse
 from django.utils.http import urlencode
 from django.utils.html import escape
+from django.utils.safestring import mark_safe
 
 from ..models import Question, Answer
+from .. import caching
 
 register = template.Library()
 
@@ -19,13 +22,47 @@ def voting_booth(post):
         id = f"answer_{post.id}"
     if isinstance(post, Answer):
         url = reverse("posts:answer_edit", kwargs={
-            "question_id": post.question.id,
+            "question_id": post.question_id,
             "answer_id": post.id
         })
     else:
         url = reverse("posts:edit", kwargs={"question_id": post.id})
     return {'post': post, "id": id, "url": url}
 
+@register.simple_tag(takes_context=True)
+def question_cards(context, questions):
+    '''Render the listing card of each QuestionRow. Cards cached for
+    the same stamp are fetched in one multi-get; only the rest are
+    rendered.'''
+    show_body = context['request'].resolver_match.url_name != "main"
+    questions = list(questions)
+    keys = {
+        question.id: caching.question_card_key(question.id, show_body)
+        for question in questions
+    }
+    stamps = {
+        question.id: caching.question_card_stamp(question) for question in questions
+    }
+    cached = cache.get_many(keys.values())
+    cards, stale = {}, []
+    for question in questions:
+        stamp, card = cached.get(keys[question.id], (None, None))
+        if stamp == stamps[question.id]:
+            cards[question.id] = card
+        else:
+            stale.append(question)
+    if stale:
+        rendered = {}
+        for question in stale:
+            cards[question.id] = render_to_string(
+                "posts/question_card.html",
+                {"question": question, "show_body": show_body}
+            )
+            rendered[keys[question.id]] = (stamps[question.id], cards[question.id])
+        cache.set_many(rendered, caching.QUESTION_CARD_TIMEOUT)
+    return mark_safe("".join(cards[question.id] for question in questions))
+
+
 @register.simple_tag(takes_context=True)
 def route(context, button=None):
     request = context['request']
@@ -53,14 +90,15 @@ def route(context, button=None):
     return f"{reverse('posts:search')}?{query_string}&tab={button}"
 
 @register.simple_tag(takes_context=True)
-def set_page_number_url(context, page=None, limit=None):
+def set_page_number_url(context, page=None, limit=None, cursor=None):
     request = context['request']
     request_resolver = resolve(request.path)
     query_string = QueryDict(request.META['QUERY_STRING'])
+    default_tab = "relevance" if request_resolver.url_name == "search" else "newest"
     query_tab, search_query = [
-        query_string.get("tab", "newest"), query_string.get("q")
+        query_string.get("tab", default_tab), query_string.get("q")
     ]
-    if page:
+    if page is not None:
         page_data = {
             "pagesize": page.paginator.per_page,
             "page": page.number,
@@ -72,6 +110,9 @@ def set_page_number_url(context, page=None, limit=None):
             'page': 1,
             'tab': query_tab
         }
+    if cursor:
+        del page_data['page']
+        page_data['cursor'] = cursor
     _path = f"posts:{request_resolver.url_name}"
     if request_resolver.url_name == "tagged":
         tags = "+".join(tag for tag in context['tags'])
@@ -87,32 +128,24 @@ def set_page_number_url(context, page=None, limit=None):
 
 @register.simple_tag(takes_context=True)
 def set_previous_page_url(context, page):
-    if page.has_previous():
-        current_url = set_page_number_url(context, page)
-        page_pattern = r"(?<=page:)(?P<page_num>\d+)"
-        current_page = int(re.search(
-            page_pattern, current_url
-        ).get("page_num"))
-        return re.sub(page_pattern, f"{current_page - 1}", current_url)
-    return
+    if not page.has_previous():
+        return
+    if hasattr(page, "previous_cursor"):
+        return set_page_number_url(context, page, cursor=page.previous_cursor)
+    return set_page_number_url(
+        context, page.paginator.page(page.previous_page_number())
+    )
 
-# @register.simple_tag(takes_context=True)
-# def set_previous_page_url(context, page):
-#     current_url = set_page_number_url(context, page)
-#     page_pattern = r"(?<=page:)(?P<page_num>\d+)"
-#     current_page = int(re.search(
-#         page_pattern, current_url
-#     ).get("page_num"))
-#     return re.sub(page_pattern, f"{current_page - 1}", current_url)
 
 @register.simple_tag(takes_context=True)
 def set_next_page_url(context, page):
-    current_url = set_page_number_url(context, page)
-    page_pattern = r"(?<=page:)(?P<page_num>\d+)"
-    current_page = int(re.search(
-        page_pattern, current_url
-    ).get("page_num"))
-    return re.sub(page_pattern, f"{current_page + 1}", current_url)
+    if not page.has_next():
+        return
+    if hasattr(page, "next_cursor"):
+        return set_page_number_url(context, page, cursor=page.next_cursor)
+    return set_page_number_url(
+        context, page.paginator.page(page.next_page_number())
+    )
 
 @register.simple_tag
 def set_post_id(post):
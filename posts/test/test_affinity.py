@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from ..models import Question, Answer, Tag, ProfileTagAffinity
+from ..affinity import ASK_WEIGHT, ANSWER_WEIGHT, VOTE_WEIGHT
+from ..votes import cast_vote
+from authors.models import Profile
+
+
+class TestProfileTagAffinity(TestCase):
+    '''Verify that a profile's tag affinities follow the questions it
+    asks, answers and votes on, and drive the personalized feeds.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.asker = get_user_model().objects.create_user("Asker")
+        cls.asker_profile = Profile.objects.create(user=cls.asker)
+        cls.reader = get_user_model().objects.create_user("Reader")
+        cls.reader_profile = Profile.objects.create(user=cls.reader)
+        cls.python, cls.django, cls.rust = [
+            Tag.objects.create(name=name) for name in ("python", "django", "rust")
+        ]
+        cls.question = Question.objects.create(
+            title="How do Django signals work?", body="When are they sent?",
+            profile=cls.asker_profile
+        )
+        cls.question.tags.add(cls.python, cls.django)
+        cls.other = Question.objects.create(
+            title="Is the borrow checker strict?", body="It rejects my code",
+            profile=cls.asker_profile
+        )
+        cls.other.tags.add(cls.rust)
+
+    def weights(self, profile):
+        return dict(ProfileTagAffinity.objects.filter(
+            profile=profile
+        ).values_list("tag__name", "weight"))
+
+    def test_asking_credits_question_tags(self):
+        self.assertEqual(self.weights(self.asker_profile), {
+            "python": ASK_WEIGHT, "django": ASK_WEIGHT, "rust": ASK_WEIGHT
+        })
+        self.question.tags.remove(self.django)
+        self.assertEqual(self.weights(self.asker_profile)["django"], 0)
+
+    def test_answering_and_voting_credit_question_tags(self):
+        answer = Answer.objects.create(
+            question=self.question, body="They are sent on save",
+            profile=self.reader_profile
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            cast_vote(self.reader_profile, self.other, "like")
+        self.assertEqual(self.weights(self.reader_profile), {
+            "python": ANSWER_WEIGHT, "django": ANSWER_WEIGHT,
+            "rust": VOTE_WEIGHT
+        })
+        answer.delete()
+        self.assertEqual(self.weights(self.reader_profile), {
+            "python": 0, "django": 0, "rust": VOTE_WEIGHT
+        })
+
+    def test_interesting_feed_reads_affinities(self):
+        self.assertEqual(list(Question.postings.lookup(self.reader)), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            cast_vote(self.reader_profile, self.other, "like")
+        with self.assertNumQueries(1):
+            questions = list(Question.postings.lookup(self.reader))
+        self.assertEqual(questions, [self.other])
+
+    def test_rebuild_matches_incremental_affinities(self):
+        Answer.objects.create(
+            question=self.other, body="It is strict on purpose",
+            profile=self.reader_profile
+        )
+        expected = self.weights(self.reader_profile)
+        ProfileTagAffinity.objects.all().delete()
+        output = StringIO()
+        call_command("rebuild_tag_affinity", stdout=output)
+        self.assertIn("Stored 4 profile tag affinities", output.getvalue())
+        self.assertEqual(self.weights(self.reader_profile), expected)
@@ -0,0 +1,196 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from ..models import Question, Answer, Tag
+from .. import counts
+from authors.models import Profile
+
+
+class TestMaintainedListingCounts(TestCase):
+    '''Verify that the stored listing counts follow questions being
+    asked, answered, tagged and deleted.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user("Counter")
+        cls.profile = Profile.objects.create(user=user)
+        cls.tag = Tag.objects.create(name="python")
+        cls.question = Question.objects.create(
+            title="How do I count rows quickly?", body="Counting is slow",
+            profile=cls.profile
+        )
+        cls.question.tags.add(cls.tag)
+
+    def setUp(self):
+        for name in (counts.QUESTIONS, counts.ANSWERED, counts.UNANSWERED):
+            counts.counter_value(name)
+        counts.tag_count(self.tag.id)
+
+    def assertCounts(self, questions, answered, unanswered, tagged):
+        self.assertEqual(counts.tab_count("newest"), questions)
+        self.assertEqual(counts.tab_count("active"), answered)
+        self.assertEqual(counts.tab_count("unanswered"), unanswered)
+        self.assertEqual(counts.tag_count(self.tag.id), tagged)
+
+    def test_counters_follow_new_question(self):
+        question = Question.objects.create(
+            title="Is a second question counted?", body="Another question",
+            profile=self.profile
+        )
+        question.tags.add(self.tag)
+        self.assertCounts(2, 0, 2, 2)
+
+    def test_counters_follow_answers(self):
+        answer = Answer.objects.create(
+            question=self.question, body="Use a counter", profile=self.profile
+        )
+        Answer.objects.create(
+            question=self.question, body="Use an estimate", profile=self.profile
+        )
+        self.assertCounts(1, 1, 0, 1)
+        answer.delete()
+        self.assertCounts(1, 1, 0, 1)
+        Answer.objects.filter(question=self.question).delete()
+        self.assertCounts(1, 0, 1, 1)
+
+    def test_counters_follow_removed_tags(self):
+        self.question.tags.clear()
+        self.assertCounts(1, 0, 1, 0)
+        self.tag.questions.add(self.question)
+        self.assertCounts(1, 0, 1, 1)
+
+    def test_counters_follow_deleted_question(self):
+        self.question.delete()
+        self.assertCounts(0, 0, 0, 0)
+
+    def test_counters_follow_deleted_answered_question(self):
+        Question.objects.create(
+            title="Is an unanswered question left?", body="Still waiting",
+            profile=self.profile
+        )
+        for body in ("Count once", "Count twice"):
+            Answer.objects.create(question=self.question, body=body, profile=self.profile)
+        self.assertCounts(2, 1, 1, 1)
+        self.question.delete()
+        self.assertCounts(1, 0, 1, 0)
+
+    def test_counter_read_without_counting(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(counts.tab_count("newest"), 1)
+
+    def test_searches_counted_by_counters(self):
+        # Counters moved away from the true counts show which are read.
+        counts.adjust_counters({
+            counts.tag_counter(self.tag.id): 40, counts.UNANSWERED: 20
+        })
+        response = self.client.get(reverse("posts:tagged", kwargs={"tags": "python"}))
+        self.assertContains(response, "41 questions")
+        self.assertContains(response, "How do I count rows quickly?")
+        search = reverse("posts:search")
+        for query, tab, expected in [
+            ("is:unanswered", "relevance", "21 questions"),
+            ("is:unanswered", "unanswered", "21 questions"),
+            ("[python] is:unanswered", "newest", "1 questions"),
+        ]:
+            with self.subTest(query=query, tab=tab):
+                response = self.client.get(search, {"q": query, "tab": tab})
+                self.assertContains(response, expected)
+
+
+class TestQuestionAnswerCount(TestCase):
+    '''Verify that Question.answer_count follows its answers and can
+    be reconciled when it drifts.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("Answerer")
+        cls.profile = Profile.objects.create(user=cls.user)
+        cls.question = Question.objects.create(
+            title="Why is my answer count stale?", body="It never changes",
+            profile=cls.profile
+        )
+
+    def test_answer_count_follows_answers(self):
+        answer = Answer.objects.create(
+            question=self.question, body="It is updated now", profile=self.profile
+        )
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.answer_count, 1)
+        answer.delete()
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.answer_count, 0)
+
+    def test_posted_answer_counted(self):
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse("posts:question", kwargs={"question_id": self.question.id}),
+            data={"body": "The answer count is kept on the question row and updated"}
+        )
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.answer_count, 1)
+
+    def test_listings_filter_on_answer_count(self):
+        Answer.objects.create(
+            question=self.question, body="Answered", profile=self.profile
+        )
+        active, query = Question.searches.lookup("", "active")
+        unanswered, query = Question.searches.lookup("", "unanswered")
+        self.assertEqual(list(active), [self.question])
+        self.assertEqual(list(unanswered), [])
+
+    def test_reconcile_answer_counts_command(self):
+        Answer.objects.create(
+            question=self.question, body="Answered", profile=self.profile
+        )
+        Question.objects.update(answer_count=5)
+        output = StringIO()
+        call_command("reconcile_answer_counts", stdout=output)
+        self.assertIn("Corrected the answer count of 1 questions", output.getvalue())
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.answer_count, 1)
+
+
+class TestCachedCounts(TestCase):
+    '''Verify that arbitrary listing counts are cached and estimated
+    once they grow past the exact counting limit.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user("Estimator")
+        profile = Profile.objects.create(user=user)
+        Question.objects.bulk_create([
+            Question(
+                title=f"Question number {i:02}", body="Content of the question",
+                profile=profile, score=i % 2
+            ) for i in range(30)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_count_skips_database(self):
+        queryset = Question.objects.filter(score=1)
+        self.assertEqual(counts.cached_count(queryset, "odd"), 15)
+        with self.assertNumQueries(0):
+            count = counts.cached_count(queryset, "odd")
+        self.assertEqual(count, 15)
+        self.assertFalse(count.estimated)
+
+    def test_large_count_is_estimated(self):
+        queryset = Question.objects.filter(score=1)
+        with patch.object(counts, "ESTIMATE_ABOVE", 10):
+            count = counts.estimate_count(queryset)
+        self.assertTrue(count.estimated)
+        self.assertGreater(count, 10)
+
+    def test_small_count_is_exact(self):
+        queryset = Question.objects.filter(score=1, title__endswith="1")
+        count = counts.estimate_count(queryset)
+        self.assertEqual(count, 3)
+        self.assertFalse(count.estimated)
@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.contrib.auth import get_user_model
+
+from ..models import Question, Tag
+from ..pagination import KeysetPaginator, HOT_ORDER
+from .. import hotness
+from authors.models import Profile
+
+
+class TestHotScore(SimpleTestCase):
+    '''Verify that the hot score rises with activity and decays
+    with age.'''
+
+    def test_activity_raises_score(self):
+        self.assertGreater(hotness.hot_score(10, 2, 50, 1), hotness.hot_score(0, 0, 0, 1))
+        self.assertGreater(hotness.hot_score(0, 0, 0, 1), hotness.hot_score(-10, 0, 0, 1))
+
+    def test_age_decays_score(self):
+        self.assertGreater(hotness.hot_score(5, 1, 10, 0), hotness.hot_score(5, 1, 10, 3))
+
+    def test_batch_scores_match_single_scores(self):
+        rows = [(3, 1, 20, 0), (-2, 0, 5, 4), (40, 7, 900, 30)]
+        expected = [hotness.hot_score(*row) for row in rows]
+        with patch.object(hotness, "numpy", None):
+            self.assertEqual(hotness.hot_scores(*zip(*rows)), expected)
+
+    @skipUnless(hotness.numpy, "NumPy is not installed")
+    def test_numpy_scores_match_fallback(self):
+        rows = [(3, 1, 20, 0), (-2, 0, 5, 4), (0, 0, 0, -1), (40, 7, 900, 30)]
+        scores = hotness.hot_scores(*zip(*rows))
+        with patch.object(hotness, "numpy", None):
+            expected = hotness.hot_scores(*zip(*rows))
+        self.assertEqual(len(scores), len(expected))
+        for score, fallback in zip(scores, expected):
+            self.assertAlmostEqual(score, fallback, places=12)
+
+
+class TestHotListing(TestCase):
+    '''Verify that the recompute command ranks the Hot tab by the
+    stored hot score.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("Trender")
+        profile = Profile.objects.create(user=cls.user)
+        tag = Tag.objects.create(name="python")
+        today = date(2022, 3, 10)
+        cls.quiet, cls.popular, cls.old = [
+            Question.objects.create(
+                title=title, body="Content of the question", profile=profile,
+                date=today - timedelta(days=age), score=score, views=views
+            ) for title, age, score, views in [
+                ("A quiet question", 1, 0, 1),
+                ("A popular question", 2, 25, 400),
+                ("An old popular question", 6, 25, 400),
+            ]
+        ]
+        for question in (cls.quiet, cls.popular, cls.old):
+            question.tags.add(tag)
+
+    def lookup(self, tab):
+        with patch("posts.models.date") as mock_date:
+            mock_date.today = Mock(return_value=date(2022, 3, 10))
+            return Question.postings.lookup(self.user, tab)
+
+    def test_recompute_orders_hot_tab(self):
+        output = StringIO()
+        with patch("posts.hotness.date") as mock_date:
+            mock_date.today = Mock(return_value=date(2022, 3, 10))
+            call_command("recompute_hot_scores", stdout=output)
+        self.assertIn("Scored 3 questions", output.getvalue())
+        self.assertEqual(list(self.lookup("hot")), [self.popular, self.quiet])
+        self.assertEqual(
+            list(self.lookup("week")), [self.popular, self.quiet, self.old]
+        )
+
+    def test_keyset_paginator_follows_hot_order(self):
+        paginator = KeysetPaginator(self.lookup("week"), 2)
+        self.assertEqual(paginator.ordering, HOT_ORDER)
+        page1 = paginator.get_page()
+        page2 = paginator.get_page(page1.next_cursor)
+        self.assertEqual(len(page1) + len(page2), 3)
@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase
+
+from ..hyperloglog import HyperLogLog
+
+
+class TestHyperLogLog(SimpleTestCase):
+    '''Verify that sketches estimate distinct counts to about 1% and
+    merge into the sketch of the union of their values.'''
+
+    def sketch(self, values):
+        sketch = HyperLogLog()
+        for value in values:
+            sketch.add(f"address:{value}")
+        return sketch
+
+    def test_small_counts_exact(self):
+        self.assertEqual(self.sketch([1, 2, 2, 3, 3, 3]).count(), 3)
+        self.assertEqual(HyperLogLog().count(), 0)
+
+    def test_large_count_within_error(self):
+        count = self.sketch(range(200000)).count()
+        self.assertLess(abs(count - 200000) / 200000, 0.02)
+
+    def test_merge_counts_union(self):
+        merged = self.sketch(range(0, 30000)).merge(self.sketch(range(20000, 50000)))
+        self.assertLess(abs(merged.count() - 50000) / 50000, 0.02)
+        with self.assertRaises(ValueError):
+            merged.merge(HyperLogLog(precision=10))
+
+    def test_bytes_round_trip(self):
+        sketch = self.sketch(range(1000))
+        data = sketch.to_bytes()
+        self.assertLess(len(data), len(sketch.registers))
+        self.assertEqual(HyperLogLog.from_bytes(data).registers, sketch.registers)
+        self.assertEqual(HyperLogLog.from_bytes(memoryview(data)).count(), sketch.count())
@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ..markdown import render_markdown
+from ..models import Question, Answer
+from ..rendering import body_hash
+from authors.models import Profile
+
+
+class TestRenderMarkdown(SimpleTestCase):
+    '''Verify that Markdown renders like md_renderer.js and that no
+    markup in the source survives escaping.'''
+
+    def test_blocks(self):
+        self.assertEqual(
+            render_markdown("# Title\n\nfirst line\nsecond line\n\n> quoted"),
+            "<h1>Title</h1><p>first line<br>second line</p>"
+            "<blockquote><p>quoted</p></blockquote>"
+        )
+
+    def test_list_items_and_code_block(self):
+        self.assertEqual(
+            render_markdown("* one\n* two\n\n```\nif a < b:\n```"),
+            '<li class="mk_list_item">one</li><li class="mk_list_item">two</li>'
+            '<br/><pre><code class="block_code_snippet fill_block_width">'
+            "if a &lt; b:</code></pre><br/>"
+        )
+
+    def test_inline_styles(self):
+        self.assertEqual(
+            render_markdown("**bold** *it* snake_case_name `<b>` [docs](/help)"),
+            '<p><strong>bold</strong> <em>it</em> snake_case_name '
+            '<code class="block_code_snippet">&lt;b&gt;</code> '
+            '<a href="/help">docs</a></p>'
+        )
+
+    def test_markup_escaped(self):
+        html = render_markdown(
+            '<script>alert(1)</script> [x](javascript:alert) [y]("onclick=")'
+        )
+        self.assertNotIn("<script", html)
+        self.assertNotIn('href="javascript', html)
+        self.assertIn('<a href="&quot;onclick=&quot;">y</a>', html)
+
+
+@override_settings(PAGE_HIT_BUFFER_ENABLED=False)
+class TestRenderedPostBodies(TestCase):
+    '''Verify that post bodies are rendered once when saved and
+    re-rendered by the command only when stale.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = Profile.objects.create(
+            user=get_user_model().objects.create_user("Writer")
+        )
+        cls.question = Question.objects.create(
+            title="How is Markdown rendered?", body="With **bold** text",
+            profile=cls.profile
+        )
+
+    def test_body_rendered_on_save(self):
+        self.assertEqual(self.question.body_html, "<p>With <strong>bold</strong> text</p>")
+        self.assertEqual(self.question.body_hash, body_hash(self.question.body))
+        self.question.body = "Now *italic*"
+        self.question.save()
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.body_html, "<p>Now <em>italic</em></p>")
+
+    def test_question_page_serves_rendered_body(self):
+        url = reverse("posts:question", kwargs={"question_id": self.question.id})
+        response = self.client.get(url)
+        self.assertContains(response, "<strong>bold</strong>")
+        self.assertNotContains(response, "marked.min.js")
+
+    def test_command_renders_stale_bodies(self):
+        Answer.objects.bulk_create([
+            Answer(question=self.question, body=f"Answer `{i}`", profile=self.profile)
+            for i in range(3)
+        ])
+        output = StringIO()
+        call_command("render_post_bodies", "--chunk-size", "2", stdout=output)
+        self.assertIn("question: rendered 0 of 1 posts", output.getvalue())
+        self.assertIn("answer: rendered 3 of 3 posts in 2 chunks", output.getvalue())
+        self.assertEqual(
+            Answer.objects.order_by("id").first().body_html,
+            '<p>Answer <code class="block_code_snippet">0</code></p>'
+        )
@@ -77,6 +77,16 @@ class TestQuestionManager(TestCase):
             ], transform=repr
         )
 
+    def test_answered_questions_by_score_operator(self):
+        questions = Question.searches.lookup("is:answered score:>0", "newest")[0]
+        self.assertQuerysetEqual(
+            questions, [
+                "Question(title=Question__006)",
+                "Question(title=Question__001)",
+                "Question(title=Question__004)",
+            ], transform=repr
+        )
+
 
 class TestQuestionScoreUpVote(TestCase):
     '''Verify that a Question's score changes by one point
@@ -226,3 +236,45 @@ class TestQuestionQuerySearchManager(TestCase):
 #                 "Question(title=Test_Question_B)",
 #             ], transform=repr
 #         )
+
+
+class TestQuestionListingRows(TestCase):
+    '''Verify that listing rows carry only an excerpt of the body and
+    are loaded with their authors and tags in two queries.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        profile = Profile.objects.create(
+            user=get_user_model().objects.create_user("Lengthy")
+        )
+        tags = [Tag.objects.create(name=name) for name in ("python", "sql")]
+        for i in range(30):
+            question = Question.objects.create(
+                title=f"A long winded question {i}", body="word " * 5000,
+                profile=profile
+            )
+            question.tags.add(*tags[:i % 3])
+
+    def test_rows_loaded_in_two_queries(self):
+        with self.assertNumQueries(2) as context:
+            rows = list(Question.objects.order_by("id").rows())
+        sql = context.captured_queries[0]['sql']
+        self.assertIn('SUBSTR("question"."body", 1, 201)', sql)
+        self.assertEqual(sql.count('"question"."body"'), 1)
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(rows[0].author, "Lengthy")
+        self.assertEqual(
+            [row.tags for row in rows[:3]], [[], ["python"], ["python", "sql"]]
+        )
+        self.assertLessEqual(len(rows[0].excerpt), 201)
+        self.assertTrue(rows[0].excerpt.endswith("…"))
+        with self.assertRaises(AttributeError):
+            rows[0].body = "rows have no body"
+
+    def test_rows_keep_queryset_behaviour(self):
+        with self.assertNumQueries(2):
+            rows = list(Question.postings.get_queryset().filter(
+                tags__name="sql"
+            ).rows()[:5])
+        self.assertEqual(len(rows), 5)
+        self.assertTrue(all("sql" in row.tags for row in rows))
@@ -0,0 +1,168 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Question, QuestionPageHit, QuestionViewSketch
+from ..hyperloglog import HyperLogLog
+from ..pagehits import PageHitBuffer, compact_page_hits, view_history
+from .. import pagehits
+from authors.models import Profile
+
+
+@override_settings(PAGE_HIT_BUFFER_ENABLED=False)
+class TestPageHitBuffer(TestCase):
+    '''Verify that page hits are deduplicated within the window and
+    written together in bulk.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("Reader")
+        profile = Profile.objects.create(user=cls.user)
+        cls.questions = [
+            Question.objects.create(
+                title=f"A much viewed question {i}", body="Everyone reads it",
+                profile=profile
+            ) for i in range(2)
+        ]
+
+    def setUp(self):
+        self.buffer = PageHitBuffer(interval=0, max_hits=1000, window=60)
+
+    def test_repeated_hits_dropped_within_window(self):
+        question = self.questions[0]
+        self.assertTrue(self.buffer.add(question.id, self.user.id, "10.0.0.1"))
+        self.assertFalse(self.buffer.add(question.id, self.user.id, "10.0.0.2"))
+        self.assertTrue(self.buffer.add(question.id, None, "10.0.0.1"))
+        self.assertFalse(self.buffer.add(question.id, None, "10.0.0.1"))
+        self.assertTrue(self.buffer.add(self.questions[1].id, None, "10.0.0.1"))
+        self.assertEqual(self.buffer.pending(), 3)
+        self.buffer.window = 0
+        self.assertTrue(self.buffer.add(question.id, None, "10.0.0.1"))
+
+    def test_flush_bulk_inserts_hits(self):
+        for i in range(5):
+            self.buffer.add(self.questions[i % 2].id, None, f"10.0.0.{i}")
+        self.buffer.add(999, None, "10.0.0.1")
+        self.assertEqual(QuestionPageHit.objects.count(), 0)
+        self.assertEqual(self.buffer.flush(), 5)
+        self.assertEqual(
+            QuestionPageHit.objects.filter(question=self.questions[0]).count(), 3
+        )
+        self.assertEqual(self.buffer.pending(), 0)
+
+    def test_buffer_flushes_when_full(self):
+        self.buffer.max_hits = 3
+        for i in range(3):
+            self.buffer.add(self.questions[0].id, None, f"10.0.0.{i}")
+        self.assertEqual(QuestionPageHit.objects.count(), 3)
+
+    def test_question_page_records_hit_once(self):
+        url = reverse("posts:question", kwargs={"question_id": self.questions[0].id})
+        with patch.object(pagehits, "page_hits", self.buffer):
+            for i in range(3):
+                self.assertEqual(self.client.get(url).status_code, 200)
+            self.client.force_login(self.user)
+            self.client.get(url)
+        self.assertEqual(
+            list(QuestionPageHit.objects.values_list("profile_id", "address")),
+            [(None, "127.0.0.1"), (self.user.id, "127.0.0.1")]
+        )
+        self.assertContains(self.client.get(url), "viewed 2 times")
+
+    @override_settings(PAGE_HIT_BUFFER_ENABLED=True, PAGE_HIT_WINDOW=0)
+    def test_buffered_page_view_writes_nothing(self):
+        self.buffer.window = None
+        url = reverse("posts:question", kwargs={"question_id": self.questions[0].id})
+        with patch.object(pagehits, "page_hits", self.buffer):
+            self.client.get(url)
+            self.client.get(url)
+        self.assertEqual(QuestionPageHit.objects.count(), 0)
+        self.assertEqual(self.buffer.pending(), 2)
+
+    def test_failed_write_does_not_fail_page_view(self):
+        url = reverse("posts:question", kwargs={"question_id": self.questions[0].id})
+        with patch.object(pagehits, "page_hits", self.buffer), \
+                patch.object(QuestionPageHit.objects, "bulk_create",
+                             side_effect=OperationalError("database is locked")), \
+                self.assertLogs("posts.pagehits", "ERROR"):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.buffer.pending(), 1)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(QuestionPageHit.objects.count(), 1)
+
+    def test_flush_folds_unique_viewers_into_views(self):
+        question = self.questions[0]
+        for i in range(3):
+            self.buffer.add(question.id, None, f"10.0.0.{i}")
+        self.buffer.add(question.id, self.user.id, "10.0.0.0")
+        self.buffer.flush()
+        question.refresh_from_db()
+        self.assertEqual(question.views, 4)
+        # Another process's sketch of overlapping viewers merges in.
+        other = PageHitBuffer(interval=0, window=60)
+        for i in range(2, 6):
+            other.add(question.id, None, f"10.0.0.{i}")
+        other.flush()
+        question.refresh_from_db()
+        self.assertEqual(question.views, 7)
+        sketch = HyperLogLog.from_bytes(
+            QuestionViewSketch.objects.get(question=question).sketch
+        )
+        self.assertEqual(sketch.count(), 7)
+        self.assertEqual(QuestionPageHit.objects.count(), 8)
+
+
+class TestPageHitCompaction(TestCase):
+    '''Verify that old page hits are rolled into daily aggregates and
+    deleted in batches, and that view history reads the rollups.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        profile = Profile.objects.create(
+            user=get_user_model().objects.create_user("Asker")
+        )
+        cls.question = Question.objects.create(
+            title="A question viewed for weeks", body="Its hits pile up",
+            profile=profile
+        )
+        cls.now = timezone.now()
+        cls.old_day = timezone.localdate(cls.now - timedelta(days=40))
+        hits = [
+            (cls.now - timedelta(days=40), f"10.0.0.{i % 3}") for i in range(5)
+        ] + [
+            (cls.now - timedelta(days=39), "10.0.0.1"),
+            (cls.now - timedelta(days=1), "10.0.0.9"),
+        ]
+        QuestionPageHit.objects.bulk_create([
+            QuestionPageHit(question=cls.question, address=address, timestamp=timestamp)
+            for timestamp, address in hits
+        ])
+
+    def test_compaction_rolls_up_and_deletes_old_hits(self):
+        before = self.now - timedelta(days=30)
+        self.assertEqual(compact_page_hits(before, batch_size=2), 6)
+        self.assertEqual(QuestionPageHit.objects.count(), 1)
+        history = view_history(self.question.id)
+        self.assertEqual(history[0], (self.old_day, 5, 3))
+        self.assertEqual([row[1:] for row in history[1:]], [(1, 1)])
+        self.assertEqual(compact_page_hits(before), 0)
+
+    def test_history_endpoint_reads_rollups(self):
+        call_command("compact_page_hits", "--days", "30", stdout=StringIO())
+        url = reverse("api_posts:views", kwargs={"id": self.question.id})
+        response = self.client.get(url, {"days": 60})
+        self.assertEqual(
+            [(row['hits'], row['unique_viewers']) for row in response.json()],
+            [(5, 3), (1, 1)]
+        )
+        self.assertEqual(self.client.get(url, {"days": 7}).json(), [])
+        for days in (1000000, 99999999999):
+            with self.subTest(days=days):
+                self.assertEqual(len(self.client.get(url, {"days": days}).json()), 2)
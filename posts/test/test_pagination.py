@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from ..models import Question
+from ..pagination import KeysetPaginator, encode_cursor
+from authors.models import Profile
+
+
+class TestKeysetPaginator(TestCase):
+    '''Verify that a listing can be paged through forwards and
+    backwards with cursors in the listing order.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user("Pager")
+        profile = Profile.objects.create(user=user)
+        today = date(2022, 3, 1)
+        cls.questions = [
+            Question.objects.create(
+                title=f"Question number {i:02}", body="Content of the question",
+                profile=profile, date=today - timedelta(days=i // 3),
+                views=i % 3, score=0
+            ) for i in range(12)
+        ]
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(Question.postings.get_queryset(), 5)
+        self.ordered = list(Question.postings.get_queryset())
+
+    def test_pages_follow_listing_order(self):
+        page1 = self.paginator.get_page()
+        page2 = self.paginator.get_page(page1.next_cursor)
+        page3 = self.paginator.get_page(page2.next_cursor)
+        self.assertEqual(
+            list(page1) + list(page2) + list(page3), self.ordered
+        )
+        self.assertFalse(page1.has_previous())
+        self.assertTrue(page2.has_next())
+        self.assertFalse(page3.has_next())
+        self.assertIsNone(page3.next_cursor)
+
+    def test_previous_cursor_returns_preceding_page(self):
+        page1 = self.paginator.get_page()
+        page2 = self.paginator.get_page(page1.next_cursor)
+        previous = self.paginator.get_page(page2.previous_cursor)
+        self.assertEqual(list(previous), list(page1))
+        self.assertFalse(previous.has_previous())
+
+    def test_malformed_cursor_returns_first_page(self):
+        for cursor in [
+            "not-a-cursor", encode_cursor("after", [1, 2]),
+            encode_cursor("after", [["x"], 1, 1, 1]),
+            encode_cursor("after", [None, 1, 1, 1]),
+        ]:
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_page(cursor)
+                self.assertEqual(list(page), self.ordered[:5])
+
+    def test_exhausted_cursor_returns_first_page(self):
+        for cursor in [
+            encode_cursor("after", ["2020-01-01", 1, 1, 1]),
+            self.paginator.cursor_for(self.ordered[0], "before"),
+        ]:
+            with self.subTest(cursor=cursor):
+                page = self.paginator.get_page(cursor)
+                self.assertEqual(list(page), self.ordered[:5])
+                self.assertFalse(page.has_previous())
+        for cursor in [
+            encode_cursor("after", [["x"], 1, 1, 1]),
+            encode_cursor("after", [None, 1, 1, 1]),
+            encode_cursor("after", ["2020-01-01", 1, 1, 1]),
+        ]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    reverse("posts:main_paginated"), {"pagesize": 10, "cursor": cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_deep_page_seeks_without_offset(self):
+        cursor = self.paginator.cursor_for(self.ordered[9], "after")
+        with self.assertNumQueries(1):
+            page = self.paginator.get_page(cursor)
+            self.assertEqual(list(page), self.ordered[10:])
+
+    def test_all_questions_page_next_link(self):
+        response = self.client.get(
+            f"{reverse('posts:main_paginated')}?pagesize=10"
+        )
+        self.assertEqual(response.status_code, 200)
+        next_page = response.context['questions'].next_cursor
+        self.assertContains(response, f"cursor={next_page}")
+        response = self.client.get(
+            f"{reverse('posts:main_paginated')}?pagesize=10&cursor={next_page}"
+        )
+        self.assertEqual(
+            [row.id for row in response.context['questions']],
+            [question.id for question in self.ordered[10:]]
+        )
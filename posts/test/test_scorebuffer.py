@@ -0,0 +1,99 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Question, Answer
+from ..scorebuffer import ScoreBuffer
+from .. import caching, scorebuffer
+from ..votes import cast_vote
+from authors.models import Profile
+
+
+class TestScoreBuffer(TestCase):
+    '''Verify that buffered score deltas are merged into reads and
+    written together in a single UPDATE per model.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user("Popular")
+        cls.profile = Profile.objects.create(user=user)
+        cls.questions = [
+            Question.objects.create(
+                title=f"A popular question {i}", body="Everyone votes on it",
+                profile=cls.profile
+            ) for i in range(2)
+        ]
+        cls.answer = Answer.objects.create(
+            question=cls.questions[0], body="A popular answer", profile=cls.profile
+        )
+
+    def setUp(self):
+        self.buffer = ScoreBuffer(interval=None, max_votes=1000)
+
+    def scores(self):
+        return list(Question.objects.order_by("id").values_list("score", flat=True))
+
+    def test_flush_writes_one_update_per_model(self):
+        for delta in (1, 1, -1, 1):
+            self.buffer.add(Question, self.questions[0].id, delta)
+        self.buffer.add(Question, self.questions[1].id, -1)
+        self.buffer.add(Answer, self.answer.id, 1)
+        self.assertEqual(self.scores(), [0, 0])
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.buffer.flush(), 3)
+        updates = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(self.scores(), [2, -1])
+        self.assertEqual(Answer.objects.get().score, 1)
+
+    def test_buffer_flushes_when_full(self):
+        self.buffer.max_votes = 3
+        for i in range(3):
+            self.buffer.add(Question, self.questions[0].id, 1)
+        self.assertEqual(self.scores(), [3, 0])
+        self.assertEqual(self.buffer.pending(Question, self.questions[0].id), 0)
+
+    def test_failed_flush_from_add_keeps_deltas(self):
+        self.buffer.max_votes = 2
+        self.buffer.add(Question, self.questions[0].id, 1)
+        with patch.object(Question.objects, "filter",
+                          side_effect=OperationalError("database is locked")), \
+                self.assertLogs("posts.scorebuffer", "ERROR"):
+            self.buffer.add(Question, self.questions[0].id, 1)
+        self.assertEqual(self.buffer.pending(Question, self.questions[0].id), 2)
+        self.buffer.flush()
+        self.assertEqual(self.scores(), [2, 0])
+
+    def test_flush_expires_cached_question_pages(self):
+        cache.clear()
+        versions = [caching.question_version(question.id) for question in self.questions]
+        self.buffer.add(Answer, self.answer.id, 1)
+        self.buffer.flush()
+        self.assertNotEqual(caching.question_version(self.questions[0].id), versions[0])
+        self.assertEqual(caching.question_version(self.questions[1].id), versions[1])
+        self.buffer.add(Question, self.questions[1].id, 1)
+        self.buffer.flush()
+        self.assertNotEqual(caching.question_version(self.questions[1].id), versions[1])
+
+    def test_buffered_votes_merged_into_live_score(self):
+        with patch.object(scorebuffer, "score_buffer", self.buffer), \
+                patch("posts.models.score_buffer", self.buffer), \
+                patch.object(scorebuffer, "SCORE_BUFFER_ENABLED", True):
+            for i in range(3):
+                voter = Profile.objects.create(
+                    user=get_user_model().objects.create_user(f"Voter{i}")
+                )
+                with self.captureOnCommitCallbacks(execute=True):
+                    cast_vote(voter, self.questions[0], "like")
+            question = Question.objects.get(id=self.questions[0].id)
+            self.assertEqual((question.score, question.live_score), (0, 3))
+            self.buffer.flush()
+            question.refresh_from_db()
+            self.assertEqual((question.score, question.live_score), (3, 3))
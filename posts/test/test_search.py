@@ -0,0 +1,151 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from ..models import Tag, Question, Answer
+from ..search import match_expression
+from authors.models import Profile
+
+
+class TestFullTextMatchExpression(SimpleTestCase):
+    '''Verify that search text is reduced to quoted prefix terms.'''
+
+    def test_match_expression_quotes_words(self):
+        self.assertEqual(
+            match_expression(["//django", "form-inheritance"]),
+            '"django"* "form"* "inheritance"*'
+        )
+
+    def test_match_expression_exact_phrases(self):
+        self.assertEqual(
+            match_expression(["django"], ['class "based" views']),
+            '"django"* "class ""based"" views"'
+        )
+
+    def test_match_expression_without_words(self):
+        self.assertIsNone(match_expression(["?!"]))
+
+
+class TestFullTextQuestionSearch(TestCase):
+    '''Verify that questions are ranked by relevance against
+    both their titles and bodies.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username="Searcher", password="searchpass"
+        )
+        cls.profile = Profile.objects.create(user=cls.user)
+        cls.tag = Tag.objects.create(name="python")
+        cls.question1 = Question.objects.create(
+            title="How are generators consumed lazily?",
+            body="My loop never ends when I iterate a decorator output",
+            profile=cls.profile
+        )
+        cls.question2 = Question.objects.create(
+            title="Why does my decorator lose the wrapped docstring?",
+            body="The decorator replaces the function metadata",
+            profile=cls.profile
+        )
+        cls.question3 = Question.objects.create(
+            title="What is a metaclass?",
+            body="I keep seeing type used as a base class",
+            profile=cls.profile
+        )
+
+    def test_search_matches_title_and_body(self):
+        queryset, query_data = Question.searches.lookup("decorator")
+        self.assertEqual(queryset.count(), 2)
+
+    def test_search_ranked_by_relevance(self):
+        queryset, query_data = Question.searches.lookup(
+            "decorator", "relevance"
+        )
+        self.assertQuerysetEqual(
+            queryset, [
+                "Question(title=Why does my decorator lose the wrapped docstring?)",
+                "Question(title=How are generators consumed lazily?)",
+            ], transform=repr
+        )
+
+    def test_search_exact_phrase(self):
+        queryset, query_data = Question.searches.lookup(
+            '"the function metadata"'
+        )
+        self.assertQuerysetEqual(
+            queryset, [
+                "Question(title=Why does my decorator lose the wrapped docstring?)",
+            ], transform=repr
+        )
+
+    def test_title_operator_scopes_following_words(self):
+        queryset, query_data = Question.searches.lookup("title:decorator")
+        self.assertQuerysetEqual(
+            queryset, [
+                "Question(title=Why does my decorator lose the wrapped docstring?)",
+            ], transform=repr
+        )
+        queryset, query_data = Question.searches.lookup("lazily title:decorator")
+        self.assertFalse(queryset.exists())
+
+    def test_edited_question_reindexed(self):
+        self.question3.title = "What is a decorator metaclass?"
+        self.question3.save()
+        queryset, query_data = Question.searches.lookup("decorator")
+        self.assertEqual(queryset.count(), 3)
+
+    def test_deleted_question_unindexed(self):
+        self.question1.delete()
+        queryset, query_data = Question.searches.lookup("decorator")
+        self.assertEqual(queryset.count(), 1)
+
+    def test_asked_question_indexed(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse("posts:ask"), data={
+            "title": "Can a classmethod be used as a decorator?",
+            "body": "I would like a decorator that also receives the class it is defined on",
+            "tags_0": "python"
+        })
+        response = self.client.get(
+            f"{reverse('posts:search')}?{urlencode({'q': 'title:classmethod'})}"
+        )
+        self.assertContains(response, "Can a classmethod be used as a decorator?")
+
+
+class TestCachedSearchResults(TestCase):
+    '''Verify that the ordered ids of a search are served from the
+    cache until a question or one of its answers changes.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user("Cacher")
+        cls.profile = Profile.objects.create(user=user)
+        cls.question = Question.objects.create(
+            title="Why is my queryset evaluated twice?",
+            body="Iterating a queryset after calling len on it runs another query",
+            profile=cls.profile
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_search_ids_served_from_cache(self):
+        question_ids, query_data = Question.searches.lookup_ids(
+            "title:queryset", "active"
+        )
+        self.assertEqual(question_ids, [])
+        with self.assertNumQueries(0):
+            Question.searches.lookup_ids("  title:queryset ", "active")
+
+    def test_answered_question_expires_cached_ids(self):
+        Question.searches.lookup_ids("title:queryset", "active")
+        Answer.objects.create(
+            body="The result cache is only filled by iteration",
+            question=self.question, profile=self.profile
+        )
+        question_ids, query_data = Question.searches.lookup_ids(
+            "title:queryset", "active"
+        )
+        self.assertEqual(question_ids, [self.question.id])
@@ -0,0 +1,176 @@
+from array import array
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from ..models import Tag, Question, IndexStamp
+from .. import models
+from ..tagindex import (
+    intersect_postings, tag_index, tag_completion, TagCompletionIndex
+)
+from authors.models import Profile
+
+
+class TestPostingListIntersection(SimpleTestCase):
+    '''Verify that sorted posting lists are intersected in order.'''
+
+    def test_intersect_multiple_postings(self):
+        postings = [
+            array("q", [1, 4, 6, 9, 12, 40]),
+            array("q", [4, 9, 40]),
+            array("q", [2, 4, 9, 13, 40, 41])
+        ]
+        self.assertEqual(intersect_postings(postings), [4, 9, 40])
+
+    def test_intersect_with_empty_posting(self):
+        postings = [array("q", [1, 2]), array("q")]
+        self.assertEqual(intersect_postings(postings), [])
+
+
+class TestTagPostingIndex(TestCase):
+    '''Verify that the tag index follows changes made to a
+    question's tags and is rebuilt when its stamp goes stale.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user("Tagger")
+        cls.profile = Profile.objects.create(user=user)
+        cls.python, cls.django, cls.orm = [
+            Tag.objects.create(name=name) for name in ("python", "django", "orm")
+        ]
+        cls.question1 = Question.objects.create(
+            title="How are Django querysets evaluated?",
+            body="When does the ORM actually hit the database?",
+            profile=cls.profile
+        )
+        cls.question1.tags.add(cls.python, cls.django, cls.orm)
+        cls.question2 = Question.objects.create(
+            title="Are Python lists thread safe?",
+            body="Can two threads append to the same list?",
+            profile=cls.profile
+        )
+        cls.question2.tags.add(cls.python)
+
+    def test_multiple_tag_intersection(self):
+        self.assertEqual(
+            tag_index.question_ids(["Python", "django"]), [self.question1.id]
+        )
+        self.assertEqual(
+            tag_index.question_ids(["python"]),
+            [self.question1.id, self.question2.id]
+        )
+
+    def test_index_updated_when_tags_set(self):
+        tag_index.question_ids(["python"])
+        stamp = IndexStamp.objects.get(name=tag_index.name).token
+        self.question2.tags.set([self.django])
+        self.assertNotEqual(IndexStamp.objects.get(name=tag_index.name).token, stamp)
+        self.assertEqual(tag_index.question_ids(["python"]), [self.question1.id])
+        self.assertEqual(
+            tag_index.question_ids(["django"]),
+            [self.question1.id, self.question2.id]
+        )
+
+    def test_stale_stamp_rebuilds_index(self):
+        tag_index.question_ids(["orm"])
+        IndexStamp.objects.filter(name=tag_index.name).update(token="stale")
+        Question.tags.through.objects.filter(question=self.question1).delete()
+        self.assertEqual(tag_index.question_ids(["orm"]), [])
+
+    def test_tagged_page_lists_intersection(self):
+        response = self.client.get(
+            reverse("posts:tagged", kwargs={"tags": "python+orm"})
+        )
+        self.assertContains(response, "How are Django querysets evaluated?")
+        self.assertNotContains(response, "Are Python lists thread safe?")
+
+    def test_large_intersection_filtered_by_subquery(self):
+        for limit in (0, 500):
+            with self.subTest(limit=limit), \
+                    patch.object(models, "TAGGED_ID_LIMIT", limit):
+                queryset, query_data = Question.searches.lookup("[python] [django]")
+                self.assertEqual(
+                    list(queryset.values_list("id", flat=True)), [self.question1.id]
+                )
+                self.assertEqual("question_tags" in str(queryset.query), limit == 0)
+
+    def test_rebuild_tag_index_command(self):
+        output = StringIO()
+        call_command("rebuild_tag_index", stdout=output)
+        self.assertIn("Indexed 4 taggings across 3 tags", output.getvalue())
+
+
+class TestTagCompletion(TestCase):
+    '''Verify that tag prefixes are completed from memory, ranked by
+    question count, and follow newly created tags.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user("Completer")
+        cls.profile = Profile.objects.create(user=user)
+        cls.python, cls.pytest, cls.pyqt, cls.rust = [
+            Tag.objects.create(name=name)
+            for name in ("python", "pytest", "pyqt", "rust")
+        ]
+        for i, tags in enumerate([
+            [cls.python, cls.pytest], [cls.python], [cls.pytest], [cls.python]
+        ]):
+            question = Question.objects.create(
+                title=f"Question about tags {i}", body="Which tag applies?",
+                profile=cls.profile
+            )
+            question.tags.add(*tags)
+
+    def setUp(self):
+        tag_completion.rebuild()
+
+    def test_prefix_ranked_by_question_count(self):
+        self.assertEqual(
+            tag_completion.complete("Py"),
+            [("python", 3), ("pytest", 2), ("pyqt", 0)]
+        )
+        self.assertEqual(tag_completion.complete("pyt", limit=1), [("python", 3)])
+        self.assertEqual(tag_completion.complete("go"), [])
+
+    def test_memo_keeps_recent_prefixes(self):
+        index = TagCompletionIndex(refresh=None, memo_size=2)
+        index.rebuild()
+        for prefix in ["p", "py", "r", "p", "x" * 100]:
+            index.complete(prefix)
+        self.assertEqual(list(index._ranked), ["p", "x" * 100])
+        self.assertEqual(index.complete("py"), [
+            ("python", 3), ("pytest", 2), ("pyqt", 0)
+        ])
+
+    def test_unloaded_index_loads_outside_the_request(self):
+        index = TagCompletionIndex(refresh=None)
+        with patch.object(index, "_schedule") as schedule, self.assertNumQueries(0):
+            self.assertEqual(index.complete("py"), [])
+        schedule.assert_called_once_with(0)
+
+    def test_endpoint_answers_without_queries(self):
+        url = reverse("api_tags:complete")
+        self.client.get(url, {"prefix": "r"})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"prefix": "py", "limit": 2})
+        self.assertEqual(response.json(), [
+            {"name": "python", "questions": 3},
+            {"name": "pytest", "questions": 2}
+        ])
+
+    def test_created_tags_completed_after_commit(self):
+        tag_completion.complete("")
+        with self.captureOnCommitCallbacks(execute=True):
+            question = Question.objects.create(
+                title="Question about a new tag", body="Which tag applies?",
+                profile=self.profile
+            )
+            question.tags.add(Tag.objects.create(name="pyramid"), self.pyqt)
+        self.assertEqual(
+            tag_completion.complete("pyr"), [("pyramid", 1)]
+        )
+        self.assertEqual(tag_completion.complete("pyq"), [("pyqt", 1)])
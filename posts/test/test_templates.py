@@ -1,11 +1,16 @@
 
 from unittest.mock import Mock, patch
 
-from django.test import SimpleTestCase, RequestFactory
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, RequestFactory
 from django.utils.http import urlencode
-from django.urls import reverse
+from django.urls import resolve, reverse
 from django.core.paginator import Page
+from ..models import Question, Tag
 from ..templatetags import identifiers
+from .. import caching
+from authors.models import Profile
 
 class TestRouteTemplateTag(SimpleTestCase):
     '''Verify that the {% route %} tag directs to a URL
@@ -66,3 +71,61 @@ class TestPaginatedPageLink(SimpleTestCase):
 
 class TestPreviousPageLink(SimpleTestCase):
     pass
+
+
+class TestQuestionCardsTemplateTag(TestCase):
+    '''Verify that listing cards are fetched with one multi-get and
+    only re-rendered once what they show has changed.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        profile = Profile.objects.create(
+            user=get_user_model().objects.create_user("Lister")
+        )
+        cls.tag = Tag.objects.create(name="cards")
+        cls.questions = []
+        for i in range(25):
+            question = Question.objects.create(
+                title=f"Listed question number {i}", body="Shown on a card",
+                profile=profile
+            )
+            question.tags.add(cls.tag)
+            cls.questions.append(question)
+
+    def setUp(self):
+        cache.clear()
+        request = RequestFactory().get(reverse("posts:main_paginated"))
+        request.resolver_match = resolve(request.path)
+        self.context = {"request": request}
+        # Today's questions age by the minute; hold their age still.
+        age = patch.object(caching, "timesince", return_value="0 minutes")
+        age.start()
+        self.addCleanup(age.stop)
+
+    def render(self, renders):
+        with patch.object(identifiers.cache, "get_many", wraps=cache.get_many) as get_many, \
+                patch.object(identifiers, "render_to_string", wraps=identifiers.render_to_string) as render, \
+                self.assertNumQueries(2):
+            html = identifiers.question_cards(
+                self.context, Question.objects.order_by("id").rows()
+            )
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual(render.call_count, renders)
+        return html
+
+    def test_cards_served_from_one_multi_get(self):
+        html = self.render(renders=25)
+        self.assertEqual(html.count('class="user_question_info"'), 25)
+        self.assertEqual(self.render(renders=0), html)
+
+    def test_changed_card_rerendered(self):
+        self.render(renders=25)
+        Question.objects.filter(id=self.questions[0].id).update(score=5)
+        self.assertIn("5 votes", self.render(renders=1))
+        self.questions[1].tags.add(Tag.objects.create(name="retagged"))
+        self.assertIn("retagged", self.render(renders=1))
+
+    def test_cards_rerendered_as_questions_age(self):
+        self.render(renders=25)
+        with patch.object(caching, "timesince", return_value="1 minute"):
+            self.render(renders=25)
@@ -5,9 +5,12 @@ from unittest.mock import PropertyMock, patch
 from django.urls import reverse
 from django.core.paginator import Paginator
 
+from datetime import date
+
 from ..utils import (
     resolve_search_query, retrieve_query_title, retrieve_query_tags,
-    retrieve_query_user_id, get_page_links,
+    retrieve_query_user_id, get_page_links, parse_search_query,
+    _parse_search_query, SearchQuery, Span
 )
 
 class TestSearchQueryTitle(SimpleTestCase):
@@ -105,6 +108,55 @@ class TestUserIdSearchQuery(SimpleTestCase):
                 )
 
 
+class TestSearchQueryParser(SimpleTestCase):
+    '''Verify that a search query is read into a SearchQuery
+    in a single pass, including the comparison operators.'''
+
+    def test_parsed_search_operators(self):
+        query = parse_search_query(
+            "title:generic views 'class based' score:>=3 is:answered "
+            "created:<2022-02 [python] user:12"
+        )
+        self.assertEqual(query, SearchQuery(
+            titles=("generic", "views", "class based"),
+            tags=("python", ), user=12,
+            score=Span(">=", 3, 3, ">=3"), answered=True,
+            created=Span("<", date(2022, 2, 1), date(2022, 2, 28), "<2022-02")
+        ))
+
+    def test_title_operator_scopes_until_next_operator(self):
+        query = parse_search_query('lazy "wrapped docstring" title:decorator [python] tools')
+        self.assertEqual(query, SearchQuery(
+            terms=("lazy", "tools"), phrases=("wrapped docstring", ),
+            titles=("decorator", ), tags=("python", )
+        ))
+        self.assertEqual(query.title, "decorator")
+        self.assertEqual(parse_search_query(str(query)), query)
+
+    def test_parsed_created_date_ranges(self):
+        created = parse_search_query("created:2021").created
+        self.assertEqual(
+            (created.low, created.high), (date(2021, 1, 1), date(2021, 12, 31))
+        )
+        self.assertIsNone(parse_search_query("created:2021-13").created)
+
+    def test_parsed_query_rendered_back(self):
+        query = parse_search_query('  [Django]  title:forms "model formset"  score:5')
+        self.assertEqual(str(query), 'title:forms "model formset" score:5 [django]')
+        self.assertEqual(parse_search_query(str(query)), query)
+
+    def test_tags_only_query(self):
+        self.assertTrue(parse_search_query("[python] [django]").tags_only)
+        self.assertFalse(parse_search_query("[python] is:unanswered").tags_only)
+
+    def test_normalized_queries_share_cache_entry(self):
+        _parse_search_query.cache_clear()
+        first = parse_search_query("title:django   [orm]")
+        second = parse_search_query("  title:django [orm] ")
+        self.assertIs(first, second)
+        self.assertEqual(_parse_search_query.cache_info().hits, 1)
+
+
 class TestCustomDynamicPageSelector(SimpleTestCase):
 
     def setUp(self):
@@ -3,7 +3,8 @@ from unittest.mock import patch, Mock, PropertyMock
 from datetime import date
 
 
-from django.test import TestCase, SimpleTestCase, RequestFactory
+from django.core.cache import cache
+from django.test import TestCase, SimpleTestCase, RequestFactory, override_settings
 from django.urls import reverse
 from django.utils.http import urlencode
 from django.contrib.auth import get_user_model
@@ -11,6 +12,10 @@ from authors.models import Profile
 
 from ..models import Tag, Question, Answer
 from ..forms import QuestionForm
+from ..loaders import load_question_page
+from ..votes import cast_vote
+from .. import caching
+from ..rendering import render_post
 from ..views import QuestionListingPage, EditQuestionPage, Page, PostedQuestionPage, SearchResultsPage, PaginatedPage
 
 
@@ -123,6 +128,7 @@ class TestGetEditQuestionPage(TestCase):
         self.assertContains(response, "Edit your question")
 
 
+@override_settings(PAGE_HIT_BUFFER_ENABLED=False)
 class TestPostEditQuestionPage(TestCase):
     '''Verify that a message is displayed to the user in the event
     that some aspect of the previous posted question was edited.'''
@@ -159,6 +165,7 @@ class TestPostEditQuestionPage(TestCase):
             status_code=303
         )
 
+@override_settings(PAGE_HIT_BUFFER_ENABLED=False)
 class TestGetPostedQuestionPage(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -188,6 +195,7 @@ class TestGetPostedQuestionPage(TestCase):
         self.assertContains(response, "MainUser_000")
 
 
+@override_settings(PAGE_HIT_BUFFER_ENABLED=False)
 class TestEditInstanceAnswerPage(TestCase):
     '''Verify that a User who has posted an Answer to a given Question
     has the ability to edit their answer.'''
@@ -295,3 +303,192 @@ class TestRedirectTaggedPaginatedPage(TestCase):
         self.assertTemplateUsed(response, "posts/main.html")
         self.assertContains(response, "All Questions")
         self.assertContains(response, "Tagged with")
+
+
+@override_settings(PAGE_HIT_BUFFER_ENABLED=False)
+class TestQuestionPageQueryBudget(TestCase):
+    '''Verify that a question page is loaded and rendered in the same
+    number of queries whether it has one answer or five hundred.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("Asker", password="secretpass")
+        cls.profile = Profile.objects.create(user=cls.user)
+        answerer = Profile.objects.create(
+            user=get_user_model().objects.create_user("Answerer")
+        )
+        cls.questions = {}
+        for total in (1, 500):
+            question = Question.objects.create(
+                title=f"A question with {total} answers", body="Who will answer?",
+                profile=cls.profile
+            )
+            question.tags.add(*[
+                Tag.objects.get_or_create(name=name)[0] for name in ("python", "sql")
+            ])
+            answers = [
+                Answer(question=question, body=f"Answer {i}", profile=answerer)
+                for i in range(total)
+            ]
+            for answer in answers:
+                render_post(answer)
+            Answer.objects.bulk_create(answers)
+            cls.questions[total] = question
+
+    def test_loader_query_count(self):
+        for total, question in self.questions.items():
+            with self.subTest(answers=total), self.assertNumQueries(3):
+                loaded = load_question_page(question.id)
+                self.assertEqual(loaded.profile.user.username, "Asker")
+                self.assertEqual(len(loaded.tags.all()), 2)
+                self.assertEqual(
+                    {answer.profile.user.username for answer in loaded.answers.all()},
+                    {"Answerer"}
+                )
+
+    def test_page_query_count(self):
+        self.client.login(username="Asker", password="secretpass")
+        for total, question in self.questions.items():
+            url = reverse("posts:question", kwargs={"question_id": question.id})
+            self.client.get(url)
+            with self.subTest(answers=total), self.assertNumQueries(5):
+                response = self.client.get(url)
+            self.assertContains(response, "Answer 0")
+
+
+@override_settings(PAGE_HIT_BUFFER_ENABLED=False)
+class TestAnonymousQuestionPageCache(TestCase):
+    '''Verify that anonymous question pages are served compressed from
+    the cache until an answer, edit, vote or retagging expires them.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("Asker", password="secretpass")
+        cls.profile = Profile.objects.create(user=cls.user)
+        cls.voter = Profile.objects.create(
+            user=get_user_model().objects.create_user("Voter")
+        )
+        cls.question = Question.objects.create(
+            title="Is this page served from the cache?", body="Asked anonymously",
+            profile=cls.profile
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("posts:question", kwargs={"question_id": self.question.id})
+
+    def test_anonymous_page_cached_compressed(self):
+        response = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.content, response.content)
+        page = cache.get(caching.question_page_key(self.question.id))
+        self.assertLess(len(page), len(response.content))
+
+    def test_page_expired_by_changes(self):
+        self.client.get(self.url)
+        Answer.objects.create(
+            question=self.question, body="A fresh answer appears", profile=self.voter
+        )
+        self.assertContains(self.client.get(self.url), "A fresh answer appears")
+        cast_vote(self.voter, self.question, "up")
+        self.assertContains(
+            self.client.get(self.url),
+            f'<p id="question_{self.question.id}_score"class="posted_score">1</p>',
+            html=False
+        )
+        self.question.tags.add(Tag.objects.create(name="caching"))
+        self.assertContains(self.client.get(self.url), "caching</a>")
+        self.question.body = "Edited while cached"
+        self.question.save()
+        self.assertContains(self.client.get(self.url), "Edited while cached")
+
+    def test_signed_in_page_not_cached(self):
+        self.client.login(username="Asker", password="secretpass")
+        self.client.get(self.url)
+        self.assertIsNone(cache.get(caching.question_page_key(self.question.id)))
+        self.assertContains(self.client.get(self.url), "Answer Question")
+
+
+@override_settings(PAGE_HIT_BUFFER_ENABLED=False)
+class TestQuestionPageETag(TestCase):
+    '''Verify that question pages carry a strong ETag and that a
+    matching If-None-Match is answered with 304 until the question,
+    its answers or its votes change.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("Asker", password="secretpass")
+        cls.profile = Profile.objects.create(user=cls.user)
+        cls.voter = Profile.objects.create(
+            user=get_user_model().objects.create_user("Voter")
+        )
+        cls.question = Question.objects.create(
+            title="Is this page revalidated?", body="Asked with an ETag",
+            profile=cls.profile
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("posts:question", kwargs={"question_id": self.question.id})
+
+    def revalidate(self, etag):
+        return self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_page_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertFalse(etag.startswith("W/"))
+        with self.assertNumQueries(0):
+            response = self.revalidate(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_changes_with_question(self):
+        etag = self.client.get(self.url)['ETag']
+        Answer.objects.create(
+            question=self.question, body="An answer changes the tag", profile=self.voter
+        )
+        response = self.revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        cast_vote(self.voter, self.question, "up")
+        self.assertEqual(self.revalidate(response['ETag']).status_code, 200)
+
+    def test_etag_varies_by_user(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.login(username="Asker", password="secretpass")
+        response = self.revalidate(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.revalidate(response['ETag']).status_code, 304)
+
+
+class TestTaggedSearchResultsPaging(TestCase):
+    '''Verify that tagged listings no counter covers load one page of
+    questions and take their total from the count cache.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        profile = Profile.objects.create(
+            user=get_user_model().objects.create_user("Tagger")
+        )
+        python, sql = (Tag.objects.create(name=name) for name in ("python", "sql"))
+        for i in range(25):
+            question = Question.objects.create(
+                title=f"Tagged question number {i:02}", body="Which tags apply?",
+                profile=profile, score=i % 2
+            )
+            question.tags.add(python, sql)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_tagged_pages_skip_id_lists(self):
+        pages = [("python+sql", "newest", 25), ("python", "score", 25)]
+        for tags, tab, total in pages:
+            url = reverse("posts:tagged", kwargs={"tags": tags})
+            with self.subTest(tags=tags, tab=tab), patch.object(
+                Question.searches, "lookup_ids", side_effect=AssertionError
+            ):
+                response = self.client.get(url, {"tab": tab, "page": 3})
+                self.assertEqual(response.context['count'], total)
+                self.assertEqual(len(response.context['questions'].object_list), 5)
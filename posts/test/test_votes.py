@@ -0,0 +1,334 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APITestCase
+
+from ..models import Question, Answer, Vote, Bookmark
+from ..votes import (
+    cast_vote, switch_vote, retract_vote, load_vote_state, load_vote_states
+)
+from .. import caching, scorebuffer, votes
+from ..utils import parse_search_query
+from authors.models import Profile
+
+
+class VoteServiceTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create_user("Author")
+        cls.author = Profile.objects.create(user=author)
+        cls.user = get_user_model().objects.create_user(
+            username="Voter", password="votingpass"
+        )
+        cls.voter = Profile.objects.create(user=cls.user)
+        cls.question = Question.objects.create(
+            title="Why do my votes count twice?", body="Clicking quickly",
+            profile=cls.author
+        )
+        cls.answer = Answer.objects.create(
+            question=cls.question, body="Add a unique constraint",
+            profile=cls.author
+        )
+
+    def setUp(self):
+        ContentType.objects.get_for_models(Question, Answer)
+
+    def score(self, post):
+        return type(post).objects.values_list("score", flat=True).get(id=post.id)
+
+
+class TestVoteService(VoteServiceTestCase):
+    '''Verify that votes are inserted, switched and retracted together
+    with the score of the post voted on.'''
+
+    def test_cast_vote_once(self):
+        self.assertEqual(cast_vote(self.voter, self.question, "like").delta, 1)
+        self.assertEqual(cast_vote(self.voter, self.question, "like").delta, 0)
+        self.assertEqual(self.score(self.question), 1)
+        self.assertEqual(Vote.objects.count(), 1)
+
+    def test_switch_vote(self):
+        cast_vote(self.voter, self.answer, "up")
+        self.assertEqual(switch_vote(self.voter, self.answer, "down").delta, -2)
+        self.assertEqual(switch_vote(self.voter, self.answer, "dislike").delta, 0)
+        self.assertEqual(self.score(self.answer), -1)
+
+    def test_cast_opposite_vote_switches(self):
+        cast_vote(self.voter, self.question, "dislike")
+        self.assertEqual(cast_vote(self.voter, self.question, "like").delta, 2)
+        self.assertEqual(self.score(self.question), 1)
+
+    def test_retract_vote(self):
+        cast_vote(self.voter, self.question, "dislike")
+        self.assertEqual(retract_vote(self.voter, self.question, "like").delta, 0)
+        self.assertEqual(retract_vote(self.voter, self.question).delta, 1)
+        self.assertEqual(retract_vote(self.voter, self.question).delta, 0)
+        self.assertEqual(self.score(self.question), 0)
+
+    def test_duplicate_vote_rejected_by_database(self):
+        cast_vote(self.voter, self.question, "like")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Vote.objects.create(
+                profile=self.voter, type="like", content_object=self.question
+            )
+
+    def test_vote_expires_only_score_listings(self):
+        cache.clear()
+        listing = caching.listing_version()
+        searches = [("python", "newest"), ("python", "score"), ("score:1", "newest")]
+
+        def keys():
+            return [
+                caching.search_results_key(parse_search_query(query), tab)
+                for query, tab in searches
+            ]
+
+        before = keys()
+        cast_vote(self.voter, self.question, "like")
+        self.assertEqual(caching.listing_version(), listing)
+        self.assertEqual(
+            [key == old for key, old in zip(keys(), before)], [True, False, False]
+        )
+
+    def test_vote_writes_two_statements(self):
+        for operation, args in [
+            (cast_vote, ("like",)), (switch_vote, ("dislike",)),
+            (retract_vote, ("dislike",))
+        ]:
+            with self.subTest(operation=operation.__name__):
+                with CaptureQueriesContext(connection) as context:
+                    operation(self.voter, self.question, *args)
+                statements = [
+                    query['sql'] for query in context.captured_queries
+                    if "SAVEPOINT" not in query['sql']
+                ]
+                self.assertEqual(len(statements), 2)
+
+
+class TestVoteEndpointDoubleClick(VoteServiceTestCase):
+    '''Verify that a repeated vote request is rejected without
+    counting the vote twice.'''
+
+    def test_repeated_vote_counted_once(self):
+        self.client.login(username="Voter", password="votingpass")
+        url = reverse("api_posts:posts", kwargs={"id": self.question.id})
+        data = {"type": "like", "post": "question"}
+        self.assertEqual(self.client.post(url, data=data).status_code, 201)
+        self.assertEqual(self.client.post(url, data=data).status_code, 400)
+        self.assertEqual(self.score(self.question), 1)
+        response = self.client.delete(url, data=data)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.score(self.question), 0)
+
+
+class TestVoteStateLoader(VoteServiceTestCase):
+    '''Verify that a profile's votes on questions and their answers
+    are loaded in two queries regardless of the number of answers.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = Question.objects.create(
+            title="Is a second question loaded?", body="In the same batch",
+            profile=cls.author
+        )
+        cls.answers = [
+            Answer.objects.create(
+                question=cls.question, body=f"Answer number {i}", profile=cls.author
+            ) for i in range(20)
+        ]
+        cast_vote(cls.voter, cls.question, "up")
+        for answer in cls.answers[::2]:
+            cast_vote(cls.voter, answer, "down")
+        cast_vote(cls.voter, cls.other, "down")
+        Bookmark.objects.create(profile=cls.voter, question=cls.other)
+
+    def test_single_question_state(self):
+        with self.assertNumQueries(2):
+            state = load_vote_state(self.voter, self.question.id)
+        expected = {f"question_{self.question.id}": "up"}
+        expected.update({
+            f"answer_{answer.id}": "down" for answer in self.answers[::2]
+        })
+        self.assertEqual(state.votes, expected)
+        self.assertFalse(state.bookmarked)
+
+    def test_batch_question_states(self):
+        with self.assertNumQueries(2):
+            states = load_vote_states(
+                self.voter, [self.question.id, self.other.id]
+            )
+        self.assertEqual(len(states[self.question.id].votes), 11)
+        self.assertEqual(
+            states[self.other.id].votes, {f"question_{self.other.id}": "down"}
+        )
+        self.assertTrue(states[self.other.id].bookmarked)
+
+    def test_vote_state_endpoint_query_count(self):
+        self.client.force_login(self.user)
+        url = reverse("api_posts:posts", kwargs={"id": self.question.id})
+        self.client.get(url)
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+        self.assertEqual(response.data['vote'], "up")
+        self.assertEqual(len(response.data['answers']), 10)
+
+    def test_vote_state_endpoint_not_modified(self):
+        self.client.force_login(self.user)
+        url = reverse("api_posts:posts", kwargs={"id": self.question.id})
+        etag = self.client.get(url)['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        retract_vote(self.voter, self.answers[0])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['answers']), 9)
+        Bookmark.objects.create(profile=self.voter, question=self.question)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertTrue(response.data['bookmark'])
+
+
+class TestBatchVoteEndpoint(VoteServiceTestCase):
+    '''Verify that a batch of vote operations is applied in one request
+    with the resulting scores and per-operation errors.'''
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username="Voter", password="votingpass")
+        self.url = reverse("api_posts:votes")
+
+    def test_batch_applies_operations(self):
+        response = self.client.post(self.url, data=[
+            {"post": "question", "id": self.question.id, "type": "like", "op": "cast"},
+            {"post": "answer", "id": self.answer.id, "type": "like", "op": "cast"},
+            {"post": "answer", "id": self.answer.id, "type": "dislike", "op": "switch"},
+            {"post": "question", "id": self.question.id, "type": "like", "op": "cast"},
+        ], format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['scores'], {
+            f"question_{self.question.id}": 1, f"answer_{self.answer.id}": -1
+        })
+        self.assertEqual(
+            response.data['errors'], [{"index": 3, "errors": ["Vote unchanged"]}]
+        )
+
+    def test_batch_reports_invalid_operations(self):
+        own_question = Question.objects.create(
+            title="The voter's own question", body="Cannot be voted on",
+            profile=self.voter
+        )
+        response = self.client.post(self.url, data=[
+            {"post": "question", "id": own_question.id, "type": "up", "op": "cast"},
+            {"post": "comment", "id": 1, "type": "up", "op": "cast"},
+            {"post": "answer", "id": 999, "type": "up", "op": "cast"},
+            {"post": "question", "id": self.question.id, "type": "down", "op": "cast"},
+        ], format="json")
+        errors = {error['index']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(errors[0], ["You cannot vote on your post"])
+        self.assertIn("post", errors[1])
+        self.assertEqual(errors[2], ["Post not found"])
+        self.assertNotIn(3, errors)
+        self.assertEqual(self.score(self.question), -1)
+
+    def test_batch_rejects_non_list(self):
+        response = self.client.post(
+            self.url, data={"post": "question"}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class TestReconcileScores(VoteServiceTestCase):
+    '''Verify that drifted scores are found and rewritten from the
+    votes, chunk by chunk.'''
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.questions = [cls.question] + [
+            Question.objects.create(
+                title=f"Drifting question {i}", body="Its score drifts",
+                profile=cls.author
+            ) for i in range(4)
+        ]
+        cast_vote(cls.voter, cls.questions[1], "up")
+        cast_vote(cls.voter, cls.questions[2], "down")
+        cast_vote(cls.voter, cls.answer, "up")
+
+    def test_reconcile_fixes_only_mismatches(self):
+        Question.objects.filter(id=self.questions[1].id).update(score=7)
+        Question.objects.filter(id=self.questions[3].id).update(score=-2)
+        output = StringIO()
+        call_command(
+            "reconcile_scores", "--dry-run", "--chunk-size", "2", stdout=output
+        )
+        self.assertIn(
+            "question: checked 5 posts in 3 chunks", output.getvalue()
+        )
+        self.assertIn(
+            "found 2 mismatched scores, total drift 8, largest drift 6",
+            output.getvalue()
+        )
+        self.assertEqual(self.score(self.questions[1]), 7)
+        call_command("reconcile_scores", "--model", "question", stdout=StringIO())
+        self.assertEqual(
+            list(Question.objects.order_by("id").values_list("score", flat=True)),
+            [0, 1, -1, 0, 0]
+        )
+        self.assertEqual(self.score(self.answer), 1)
+
+    def test_reconcile_keeps_vote_cast_meanwhile(self):
+        question = self.questions[1]
+        Question.objects.filter(id=question.id).update(score=7)
+        late_voter = Profile.objects.create(
+            user=get_user_model().objects.create_user("LateVoter")
+        )
+        vote_totals = votes._vote_totals
+
+        def totals_then_vote(*args, **kwargs):
+            totals = vote_totals(*args, **kwargs)
+            if not Vote.objects.filter(profile=late_voter).exists():
+                cast_vote(late_voter, question, "up")
+            return totals
+
+        with patch.object(votes, "_vote_totals", totals_then_vote):
+            call_command("reconcile_scores", "--model", "question", stdout=StringIO())
+        self.assertEqual(self.score(question), 2)
+
+    def test_reconcile_refused_while_scores_buffered(self):
+        Question.objects.filter(id=self.questions[1].id).update(score=7)
+        with patch.object(scorebuffer, "SCORE_BUFFER_ENABLED", True), \
+                self.assertRaises(CommandError):
+            call_command("reconcile_scores", stdout=StringIO())
+        self.assertEqual(self.score(self.questions[1]), 7)
+
+
+class TestVoteTypeStorage(VoteServiceTestCase):
+    '''Verify that vote types are stored as signed small integer codes
+    and read back as their names.'''
+
+    def test_type_stored_as_code(self):
+        cast_vote(self.voter, self.question, "like")
+        cast_vote(self.voter, self.answer, "down")
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT type FROM {Vote._meta.db_table} ORDER BY id")
+            self.assertEqual([row[0] for row in cursor.fetchall()], [2, -1])
+        self.assertEqual(
+            list(Vote.objects.order_by("id").values_list("type", flat=True)),
+            ["like", "down"]
+        )
+        self.assertEqual(Vote.objects.filter(type__in=["up", "like"]).count(), 1)
+
+    def test_unknown_type_rejected(self):
+        with self.assertRaises(ValueError):
+            Vote.objects.filter(type="sideways").count()
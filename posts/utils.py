@@ -1,80 +1,204 @@
-
+from calendar import monthrange
+from datetime import date
+from functools import lru_cache
 import re
+from typing import NamedTuple, Optional
+
+from django.db.models import Max, Min, Q
+
+SEARCH_TOKENS = re.compile(r"""
+    \[(?P<tag>[^\[\]]*)\]
+    | (?P<operator>user|score|is|created):(?P<argument>[^\s\[\]]*)
+    | (?P<title>title:)
+    | "(?P<double_quoted>[^"]*)"
+    | (?<!\w)'(?P<single_quoted>[^']*)'(?!\w)
+    | (?P<word>[^\s\[\]<>"]+)
+    | \S
+""", re.VERBOSE | re.IGNORECASE)
+RESERVED_TAG_CHARACTERS = re.compile(r"[*!$&'\"()%*,/:;=@\[\]<>\s]")
+TAG_WORDS = re.compile(r"[a-zA-Z0-9#+]+")
+HASHED_TAG = re.compile(r"(?<=#)\w")
+WORD_CHARACTER = re.compile(r"\w")
+LEADING_DIGITS = re.compile(r"\d+")
+COMPARISON = re.compile(r"(?P<op>>=|<=|>|<|=)?(?P<value>.+)")
+CREATED_DATE = re.compile(r"(?P<year>\d{4})(?:-(?P<month>\d{1,2}))?(?:-(?P<day>\d{1,2}))?$")
+MAX_SEARCH_TAGS = 3
+
+
+class Span(NamedTuple):
+    '''A comparison against a bounded range; for `score:>N` both
+    bounds are N, for `created:2022-01` they are the first and last
+    day of that month.'''
+
+    operator: str
+    low: object
+    high: object
+    text: str
+
+    def as_q(self, field):
+        if self.operator == "<":
+            return Q(**{f"{field}__lt": self.low})
+        if self.operator == "<=":
+            return Q(**{f"{field}__lte": self.high})
+        if self.operator == ">":
+            return Q(**{f"{field}__gt": self.high})
+        if self.operator == ">=":
+            return Q(**{f"{field}__gte": self.low})
+        if self.low == self.high:
+            return Q(**{field: self.low})
+        return Q(**{f"{field}__range": (self.low, self.high)})
+
+
+class SearchQuery(NamedTuple):
+    '''A parsed search. Bare words and quoted phrases are full-text
+    terms, matched in a question's title or body; the words and phrases
+    following `title:`, up to the next tag or operator, must appear in
+    its title.'''
+
+    terms: tuple = ()
+    phrases: tuple = ()
+    titles: tuple = ()
+    tags: tuple = ()
+    user: Optional[int] = None
+    score: Optional[Span] = None
+    answered: Optional[bool] = None
+    created: Optional[Span] = None
+
+    @property
+    def title(self):
+        return " ".join(self.titles) or None
+
+    @property
+    def tags_only(self):
+        return bool(self.tags) and self == SearchQuery(tags=self.tags)
+
+    def as_dict(self):
+        return {
+            'title': self.title,
+            'tags': list(self.tags) or None,
+            'user': self.user
+        }
+
+    def __str__(self):
+        parts = list(self.terms)
+        parts.extend(f'"{phrase}"' for phrase in self.phrases)
+        if self.titles:
+            parts.append("title:" + " ".join(
+                f'"{title}"' if " " in title else title for title in self.titles
+            ))
+        if self.user is not None:
+            parts.append(f"user:{self.user}")
+        if self.score:
+            parts.append(f"score:{self.score.text}")
+        if self.answered is not None:
+            parts.append("is:answered" if self.answered else "is:unanswered")
+        if self.created:
+            parts.append(f"created:{self.created.text}")
+        parts.extend(f"[{tag}]" for tag in self.tags)
+        return " ".join(parts)
+
+
+def clean_query_tag(string):
+    string = RESERVED_TAG_CHARACTERS.sub("", string)
+    if not string:
+        return None
+    tag = "-".join(TAG_WORDS.findall(string.lower()))
+    if tag[:1] == "#" and HASHED_TAG.search(tag):
+        tag = tag[1:]
+    return tag or None
+
+
+def parse_score(argument):
+    comparison = COMPARISON.match(argument)
+    try:
+        value = int(comparison.group("value"))
+    except (AttributeError, ValueError):
+        return None
+    return Span(comparison.group("op") or "=", value, value, argument)
+
+
+def parse_created(argument):
+    comparison = COMPARISON.match(argument)
+    created = CREATED_DATE.match(comparison.group("value")) if comparison else None
+    if not created:
+        return None
+    year, month, day = [
+        int(created.group(part)) if created.group(part) else None
+        for part in ("year", "month", "day")
+    ]
+    try:
+        if day:
+            low = high = date(year, month, day)
+        elif month:
+            low = date(year, month, 1)
+            high = date(year, month, monthrange(year, month)[1])
+        else:
+            low, high = date(year, 1, 1), date(year, 12, 31)
+    except ValueError:
+        return None
+    return Span(comparison.group("op") or "=", low, high, argument)
+
+
+@lru_cache(maxsize=1024)
+def _parse_search_query(string):
+    terms, phrases, titles, tags = [], [], [], []
+    user = score = answered = created = None
+    in_title = False
+    for token in SEARCH_TOKENS.finditer(string):
+        kind = token.lastgroup
+        if kind in ("tag", "argument", "operator"):
+            in_title = False
+        if kind == "title":
+            in_title = True
+        elif kind == "tag":
+            tag = clean_query_tag(token["tag"])
+            if tag and len(tags) < MAX_SEARCH_TAGS:
+                tags.append(tag)
+        elif kind == "argument" or kind == "operator":
+            operator, argument = token["operator"].lower(), token["argument"]
+            if operator == "user" and user is None:
+                user_id = LEADING_DIGITS.match(argument)
+                user = int(user_id[0]) if user_id else None
+            elif operator == "score" and score is None:
+                score = parse_score(argument)
+            elif operator == "created" and created is None:
+                created = parse_created(argument)
+            elif operator == "is" and argument.lower() in ("answered", "unanswered"):
+                answered = argument.lower() == "answered"
+        elif kind in ("double_quoted", "single_quoted"):
+            phrase = " ".join(token[kind].split())
+            if WORD_CHARACTER.search(phrase):
+                (titles if in_title else phrases).append(phrase)
+        elif kind == "word" and WORD_CHARACTER.search(token["word"]):
+            (titles if in_title else terms).append(token["word"])
+    return SearchQuery(
+        tuple(terms), tuple(phrases), tuple(titles), tuple(tags),
+        user, score, answered, created
+    )
+
+
+def parse_search_query(string):
+    '''Read a search box query once into a SearchQuery. Queries are
+    normalized for whitespace so that repeated searches are served
+    from the parse cache.'''
+    return _parse_search_query(" ".join((string or "").split()))
+
 
 def retrieve_exact_phrase(string):
-    import pdb; pdb.set_trace()
-    string_pattern = re.compile(r"([\"|\'])+(?P<phrase>.+)\1+")
-    phrase = string_pattern.search(string)
-    if phrase:
-        return phrase.groupdict()['phrase']
-    return None
+    phrases = parse_search_query(string).phrases
+    return phrases[0] if phrases else None
 
 def retrieve_query_title(string):
-    title_pattern = re.compile(r'(?<=title:)\s*(?P<title>([^\[\]<>]+))')
-    # title_pattern = re.compile(r"(?<=title:)\s*(?<=[\"|'])(?P<title>\w+)(?=[\"|'])")
-    query_title = title_pattern.search(string)
-    '''query_title[0].strip() checks whether string is truthy'''
-    if query_title:
-        title = query_title[0].strip()
-        non_reserved_characters = re.compile(r"([^\[\]<>\s]+)")
-        title = " ".join(map(
-            lambda word: word.strip(),
-            non_reserved_characters.findall(query_title.group("title"))
-        ))
-        user_id_pattern_in_title = re.search(r"(\buser:{1,}\d+\b)", title)
-        if user_id_pattern_in_title:
-            user_id_start_pos, user_id_end_pos = user_id_pattern_in_title.span()
-            if user_id_start_pos == 0:
-                title = title[user_id_end_pos + 1:].strip()
-            elif user_id_end_pos == len(title) - 1:
-                title = title[0:user_id_start_pos].strip()
-            else:
-                title = f"{title[:user_id_start_pos]}{title[user_id_end_pos + 1:]}".strip()
-        title_string = title.strip('\'"')
-        if title_string:
-            return title_string
-    return None
+    return parse_search_query(string).title
 
 def retrieve_query_tags(string):
-
-    contained_tags = list(map(
-        lambda match: re.sub(r"[*!$&'\"()%*,/:;=@\[\]<>\s]", "", match[0])
-        , re.finditer(r"(?<=\[)[^\[\]]+(?=\])", string)
-    ))
-    if all(not tag for tag in contained_tags):
-        return None
-    tag_content = list(map(
-        lambda string_match: string_match[1:]
-        if string_match[0] == "#" and re.search(r"(?<=#)\w", string_match) else string_match,
-        map(
-            lambda match: "-".join(
-                re.findall(r"([a-zA-Z0-9#+]+)", match.lower())
-            ), filter(lambda tag: tag, contained_tags)
-        )
-    ))[:3]
-    return tag_content
+    return list(parse_search_query(string).tags) or None
 
 def retrieve_query_user_id(string):
-    # import pdb; pdb.set_trace()
-    user_id_search = re.compile(r"(?<=user:)(\d+)")
-    searching_by_user = user_id_search.search(string)
-    if searching_by_user:
-        # user_id = re.search(r"(\d+)", searching_by_user[0])
-        return int(searching_by_user[0])
-        # user_id = "".join(re.search(r"(\d+)", searching_by_user[0]))
-        # if user_id:
-        #     return int(user_id)
-    return None
+    return parse_search_query(string).user
 
 def resolve_search_query(string):
-    search_query_title = retrieve_query_title(string)
-    search_tags = retrieve_query_tags(string)
-    search_user = retrieve_query_user_id(string)
-    return {
-        'title': search_query_title,
-        'tags': search_tags,
-        'user': search_user
-    }
+    return parse_search_query(string).as_dict()
 
 def get_page_links(page):
     paginator = page.paginator
@@ -88,3 +212,14 @@ def get_page_links(page):
         page_index = page_links.index(page.number)
         return [paginator.page(n) for n in page_links[page_index - 2:page_index + 3]]
     return [paginator.page(n) for n in range(1, total_pages + 1)]
+
+
+def id_chunks(model, chunk_size):
+    '''Split a table into [low, high) primary key ranges.'''
+    bounds = model.objects.aggregate(low=Min("id"), high=Max("id"))
+    if bounds['low'] is None:
+        return []
+    return [
+        (low, min(low + chunk_size, bounds['high'] + 1))
+        for low in range(bounds['low'], bounds['high'] + 1, chunk_size)
+    ]
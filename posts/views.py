@@ -1,22 +1,31 @@
 
-from functools import reduce
-import re
+from functools import partial
+import time
+import zlib
 
 from django.views.generic.base import TemplateView
 from django.contrib import messages
-from django.db import IntegrityError
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import etag
 from django.core.paginator import Paginator
 
 from authors.models import Profile
 from .forms import SearchForm, QuestionForm, AnswerForm
 from .models import Question, Tag, Answer
 
-from django.http import HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect
 from authors.http_status import SeeOtherHTTPRedirect
 
-from .utils import get_page_links
+from . import caching, counts
+from .loaders import load_question_page
+from .pagehits import record_page_hit
+from .pagination import KeysetPaginator
+from .utils import get_page_links, parse_search_query
 
 
 class Page(TemplateView):
@@ -40,9 +49,10 @@ class QuestionListingPage(Page):
         context = super().get_context_data(**kwargs)
         tab_index = self.request.GET.get("tab", "interesting").lower()
         questions = Question.postings.lookup(
-            tab_index, self.request.user
-        )[:21]
-        context.update({"questions": questions, "count": questions.count()})
+            self.request.user, tab_index
+        ).rows()[:21]
+        questions = list(questions)
+        context.update({"questions": questions, "count": len(questions)})
         return context
 
     def get(self, request):
@@ -133,6 +143,25 @@ class EditQuestionPage(AskQuestionPage):
         return self.render_to_response(context)
 
 
+def question_page_etag(request, question_id):
+    '''Return the strong ETag of the question page as the requesting
+    user sees it, or None when pending messages make it a one-off.
+
+    Signed-in pages embed the user's CSRF token, so the tag varies by
+    the CSRF secret the page is rendered with as well as the user. The
+    view count on the page is not versioned; the tag also turns over
+    with the page cache timeout so that a revalidated page is never
+    older than a cached one.'''
+    if not str(question_id).isdigit() or messages.get_messages(request):
+        return None
+    viewer = ()
+    if request.user.is_authenticated:
+        get_token(request)
+        viewer = (request.user.id, request.META["CSRF_COOKIE"])
+    period = int(time.time()) // caching.QUESTION_PAGE_TIMEOUT
+    return f'"{caching.question_etag(question_id, period, *viewer)}"'
+
+
 class PostedQuestionPage(Page):
 
     template_name = "posts/question.html"
@@ -142,21 +171,42 @@ class PostedQuestionPage(Page):
         context['answer_form'] = AnswerForm
         return context
 
-    def get(self, request, question_id):
+    def render_question(self, request, question_id):
         context = self.get_context_data()
-        question = get_object_or_404(Question, id=question_id)
+        question = load_question_page(question_id)
+        record_page_hit(request, question.id)
         context['question'] = question
         return self.render_to_response(context)
 
+    @method_decorator(etag(question_page_etag))
+    def get(self, request, question_id):
+        '''Serve anonymous readers the page cached for the question's
+        current version, zlib-compressed; signed-in users and pending
+        messages get a freshly rendered page. A request whose
+        If-None-Match holds the page's ETag is answered with 304 before
+        anything is loaded.'''
+        if (request.user.is_authenticated or not str(question_id).isdigit()
+                or messages.get_messages(request)):
+            return self.render_question(request, question_id)
+        key = caching.question_page_key(question_id)
+        page = cache.get(key)
+        if page is not None:
+            record_page_hit(request, int(question_id))
+            return HttpResponse(zlib.decompress(page))
+        response = self.render_question(request, question_id).render()
+        cache.set(key, zlib.compress(response.content), caching.QUESTION_PAGE_TIMEOUT)
+        return response
+
     def post(self, request, question_id):
         question = get_object_or_404(Question, id=question_id)
         context = self.get_context_data()
         form = context['answer_form'](request.POST)
         if form.is_valid():
             form.cleaned_data.update({"profile": request.user.profile})
-            answer = Answer.objects.create(
-                **form.cleaned_data, question=question
-            )
+            with transaction.atomic():
+                answer = Answer.objects.create(
+                    **form.cleaned_data, question=question
+                )
             return SeeOtherHTTPRedirect(
                 reverse("posts:question", kwargs={
                     "question_id": answer.question.id
@@ -167,7 +217,7 @@ class PostedQuestionPage(Page):
 class EditPostedAnswerPage(PostedQuestionPage):
 
     def get(self, request, question_id, answer_id):
-        context = super().get(request, question_id).context_data
+        context = self.render_question(request, question_id).context_data
         answer = get_object_or_404(Answer, pk=answer_id)
         context.update({
             "answer_form": context['answer_form'](instance=answer),
@@ -210,24 +260,65 @@ class PaginatedPage(Page):
         })
         return context
 
+    def paginate_search(self, paginator, query, tab):
+        '''Page through the questions matching a search. Searches that
+        a maintained counter counts exactly are paged through in the
+        database with that count, and searches of nothing but tags with
+        a cached count; any other is paged through its cached list of
+        matching ids.'''
+        query_data = parse_search_query(query)
+        count = counts.search_count(query_data, tab)
+        if count is None and query_data.tags_only:
+            questions, query_data = Question.searches.lookup(query, tab)
+            count = counts.tagged_count(questions, query_data.tags, tab)
+        elif count is None:
+            question_ids, query_data = Question.searches.lookup_ids(query, tab)
+            return self.paginate_question_ids(paginator, question_ids), query_data
+        else:
+            questions, query_data = Question.searches.lookup(query, tab)
+        paginator.object_list = questions.rows()
+        paginator.count = count
+        return paginator.get_page(self.request.GET.get("page", None)), query_data
+
+    def paginate_question_ids(self, paginator, question_ids):
+        '''Page through an ordered list of question ids, loading only
+        the questions listed on the requested page.'''
+        paginator.object_list = question_ids
+        page = paginator.get_page(self.request.GET.get("page", None))
+        questions = {
+            row.id: row for row in
+            Question.objects.filter(id__in=page.object_list).rows()
+        }
+        page.object_list = [
+            questions[question_id] for question_id in page.object_list
+            if question_id in questions
+        ]
+        return page
+
 
 class AllQuestionsPage(PaginatedPage):
 
     def get(self, request):
         context = super().get_context_data()
         tab_index = request.GET.get('tab', "interesting").lower()
-        context['paginator'].object_list = Question.postings.lookup(
-            tab_index, request.user
-        )
-        page = context['paginator'].get_page(
-            request.GET.get("page", None)
+        questions = Question.postings.lookup(request.user, tab_index)
+        if request.user.is_authenticated:
+            count = partial(
+                counts.cached_count, questions, "postings", request.user.id, tab_index
+            )
+        else:
+            count = partial(counts.tab_count, "newest")
+        paginator = KeysetPaginator(
+            questions.rows(), context['paginator'].per_page, count=count
         )
+        page = paginator.get_page(request.GET.get("cursor", None))
         context.update({
             'title': "All Questions",
+            'paginator': paginator,
             "questions": page,
             'query_buttons': ["Interesting", "Hot", "Week", "Month"],
-            "page_links": get_page_links(page),
-            "count": page.paginator.count
+            "page_links": [],
+            "count": paginator.count
         })
         return self.render_to_response(context)
 
@@ -235,35 +326,24 @@ class AllQuestionsPage(PaginatedPage):
 class SearchResultsPage(PaginatedPage):
 
     def get(self, request):
-        query, tab_index = request.GET.get('q'), request.GET.get('tab', 'newest')
-        queryset, query_data = Question.searches.lookup(query, tab_index)
-        if query_data['tags'] and not query_data['title'] and not query_data['user']:
-            tags = "".join([
-                f"{tag}+" if i != len(query_data["tags"]) - 1 else f"{tag}"
-                for i, tag in enumerate(query_data["tags"])
-            ])
+        query, tab_index = request.GET.get('q'), request.GET.get('tab', 'relevance')
+        query_data = parse_search_query(query)
+        if query_data.tags_only:
+            tags = "+".join(query_data.tags)
             return HttpResponseRedirect(reverse("posts:tagged", kwargs={'tags': tags}))
         else:
             context = super().get_context_data()
-            search_value = "".join(list(reduce(
-                lambda main_string, dict_item: (
-                    main_string + f" {dict_item[0]}:\"{dict_item[1]}\" "
-                    if not isinstance(dict_item[1], list) and dict_item[0] == "title" else (
-                        main_string + f" {dict_item[0]}:{dict_item[1]} "
-                        if not isinstance(dict_item[1], list) and dict_item[0] == "user" else
-                        main_string + "".join([f"[{value}] " for value in dict_item[1] if value]).strip()
-                    )
-                ), list(filter(lambda value: value[1] is not None, query_data.items())), ""
-            ))).strip()
             context['search_form'].fields['q'].widget.attrs.update(
-                {"value": search_value}
+                {"value": str(query_data)}
             )
-            context['paginator'].object_list = queryset
-            page = context['paginator'].get_page(
-                request.GET.get("page", None)
+            page, query_data = self.paginate_search(
+                context['paginator'], query, tab_index
             )
             context.update({
                 'title': "Search Results",
+                'query_buttons': [
+                    "Relevance", "Newest", "Active", "Unanswered", "Score"
+                ],
                 'query_data': query_data,
                 'questions': page,
                 'page_links': get_page_links(page),
@@ -279,12 +359,8 @@ class TaggedSearchResultsPage(PaginatedPage):
         query = "".join(f" [{tag}] " for tag in tags.split("+"))
         tab_index = request.GET.get('tab', "newest")
         context['search_form'].fields['q'].widget.attrs.update({"value": query})
-        queryset, query_data = Question.searches.lookup(query, tab_index)
-        context['paginator'].object_list = queryset
-        page = context['paginator'].get_page(
-            request.GET.get("page", None)
-        )
-        tags = query_data['tags']
+        page, query_data = self.paginate_search(context['paginator'], query, tab_index)
+        tags = query_data.tags
         context.update({
             "title": "All Questions" if len(tags) > 1 else f"Questions tagged {tags[0]}",
             'questions': page,
@@ -0,0 +1,247 @@
+from typing import NamedTuple, Optional
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+)
+
+from . import affinity, caching, scorebuffer
+from .models import Vote, Question, Answer, Bookmark
+
+UPVOTES = ("like", "up")
+DOWNVOTES = ("dislike", "down")
+VOTE_TYPES = UPVOTES + DOWNVOTES
+VOTE_MODELS = {"question": Question, "answer": Answer}
+
+
+class VoteChange(NamedTuple):
+    vote: Optional[Vote]
+    delta: int
+
+
+class VoteState(NamedTuple):
+    votes: dict
+    bookmarked: bool
+
+
+class ScoreDrift(NamedTuple):
+    checked: int = 0
+    mismatched: int = 0
+    drift: int = 0
+    largest: int = 0
+
+    def __add__(self, other):
+        return ScoreDrift(
+            self.checked + other.checked, self.mismatched + other.mismatched,
+            self.drift + other.drift, max(self.largest, other.largest)
+        )
+
+
+def post_key(model_name, post_id):
+    return f"{model_name}_{post_id}"
+
+
+def vote_value(type):
+    return -1 if type in DOWNVOTES else 1
+
+
+def same_kind(type):
+    return DOWNVOTES if type in DOWNVOTES else UPVOTES
+
+
+def post_votes(profile, post):
+    return Vote.objects.filter(
+        profile=profile, object_id=post.id,
+        content_type=ContentType.objects.get_for_model(post)
+    )
+
+
+def _adjust_score(post, delta):
+    if scorebuffer.SCORE_BUFFER_ENABLED:
+        transaction.on_commit(
+            lambda: scorebuffer.score_buffer.add(type(post), post.id, delta)
+        )
+    else:
+        type(post).objects.filter(id=post.id).update(score=F("score") + delta)
+    caching.bump_score_version()
+    caching.bump_question_version(affinity.post_question_id(post))
+
+
+def _adjust_interest(profile, post, weight):
+    transaction.on_commit(
+        lambda: affinity.adjust_vote_affinity(profile.id, post, weight)
+    )
+
+
+def cast_vote(profile, post, type):
+    '''Insert the profile's vote on post and move the post's score by
+    one point. The unique (profile, content_type, object_id)
+    constraint turns a concurrent or repeated vote into a switch of
+    the stored vote, or into no change when it is of the same kind.'''
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                vote = Vote.objects.create(
+                    profile=profile, type=type, content_object=post
+                )
+        except IntegrityError:
+            return switch_vote(profile, post, type)
+        _adjust_score(post, vote_value(type))
+        _adjust_interest(profile, post, affinity.VOTE_WEIGHT)
+    return VoteChange(vote, vote_value(type))
+
+
+def switch_vote(profile, post, type):
+    '''Turn the profile's vote on post into one of the given kind,
+    moving the score by two points only if the kind changed.'''
+    with transaction.atomic():
+        switched = post_votes(profile, post).exclude(
+            type__in=same_kind(type)
+        ).update(type=type)
+        delta = 2 * vote_value(type) if switched else 0
+        if delta:
+            _adjust_score(post, delta)
+    return VoteChange(None, delta)
+
+
+def retract_vote(profile, post, type=None):
+    '''Delete the profile's vote on post and take its point back off
+    the score. Passing the type of the vote being retracted saves the
+    lookup of the stored vote.'''
+    with transaction.atomic():
+        votes = post_votes(profile, post)
+        if type is None:
+            type = votes.values_list("type", flat=True).first()
+            if type is None:
+                return VoteChange(None, 0)
+        deleted, _ = votes.filter(type__in=same_kind(type)).delete()
+        delta = -vote_value(type) if deleted else 0
+        if delta:
+            _adjust_score(post, delta)
+            _adjust_interest(profile, post, -affinity.VOTE_WEIGHT)
+    return VoteChange(None, delta)
+
+
+def apply_vote_operations(profile, operations):
+    '''Apply validated {post, id, type, op} operations, where op is one
+    of "cast", "switch" or "retract", in a single transaction.
+
+    Returns ({post_key: score}, {position: error}): the new score of
+    every post named by an operation, and an error for each operation
+    that was rejected or left its post unchanged.'''
+    apply = {"cast": cast_vote, "switch": switch_vote, "retract": retract_vote}
+    posts = {}
+    for name, model in VOTE_MODELS.items():
+        ids = {item['id'] for item in operations if item['post'] == name}
+        if ids:
+            posts.update({
+                post_key(name, post_id): post
+                for post_id, post in model.objects.in_bulk(ids).items()
+            })
+    errors = {}
+    with transaction.atomic():
+        for position, item in enumerate(operations):
+            post = posts.get(post_key(item['post'], item['id']))
+            if post is None:
+                errors[position] = "Post not found"
+            elif post.profile_id == profile.id:
+                errors[position] = "You cannot vote on your post"
+            elif not apply[item['op']](profile, post, item['type']).delta:
+                errors[position] = "Vote unchanged"
+    scores = {}
+    for name, model in VOTE_MODELS.items():
+        ids = [post.id for post in posts.values() if isinstance(post, model)]
+        for post_id, score in model.objects.filter(id__in=ids).values_list("id", "score"):
+            scores[post_key(name, post_id)] = (
+                score + scorebuffer.score_buffer.pending(model, post_id)
+            )
+    return scores, errors
+
+
+def load_vote_states(profile, question_ids):
+    '''Return {question_id: VoteState} for the profile's votes on each
+    question and its answers, keyed like "question_1" and "answer_4",
+    and whether it bookmarked the question. Costs two queries however
+    many questions and answers there are.'''
+    question_type, answer_type = (
+        ContentType.objects.get_for_model(model) for model in (Question, Answer)
+    )
+    question_ids = list(question_ids)
+    states = {
+        question_id: VoteState({}, False) for question_id in question_ids
+    }
+    answers = Answer.objects.filter(question_id__in=question_ids)
+    votes = Vote.objects.filter(profile=profile).filter(
+        Q(content_type=question_type, object_id__in=question_ids)
+        | Q(content_type=answer_type, object_id__in=answers.values("id"))
+    ).annotate(question_id=Subquery(
+        answers.filter(id=OuterRef("object_id")).values("question_id")[:1]
+    )).values_list("content_type_id", "object_id", "type", "question_id")
+    for content_type_id, object_id, type, question_id in votes:
+        if content_type_id == question_type.id:
+            states[object_id].votes[post_key("question", object_id)] = type
+        else:
+            states[question_id].votes[post_key("answer", object_id)] = type
+    for question_id in Bookmark.objects.filter(
+        profile=profile, question_id__in=question_ids
+    ).values_list("question_id", flat=True):
+        states[question_id] = states[question_id]._replace(bookmarked=True)
+    return states
+
+
+def load_vote_state(profile, question_id):
+    return load_vote_states(profile, [question_id])[question_id]
+
+
+def _vote_totals(model, **filters):
+    return dict(Vote.objects.filter(
+        content_type=ContentType.objects.get_for_model(model), **filters
+    ).order_by().values("object_id").annotate(total=Sum(Case(
+        When(type__in=DOWNVOTES, then=Value(-1)), default=Value(1),
+        output_field=IntegerField()
+    ))).values_list("object_id", "total"))
+
+
+def _score_mismatches(model, posts, **filters):
+    '''Return the number of posts and the (id, score, expected) of those
+    whose score differs from the total of the votes matching filters.'''
+    scores = dict(posts.values_list("id", "score"))
+    totals = _vote_totals(model, **filters)
+    return len(scores), [
+        (post_id, score, totals.get(post_id, 0))
+        for post_id, score in scores.items() if score != totals.get(post_id, 0)
+    ]
+
+
+def reconcile_score_chunk(model_name, low, high, dry_run=False):
+    '''Recompute the scores of the posts with ids in [low, high) from
+    their votes and rewrite only those that differ.
+
+    The chunk's posts are locked before their votes are summed, and a
+    score is only rewritten while it still holds the value compared, so
+    a vote landing meanwhile is never overwritten; posts whose score
+    moved are compared again.'''
+    model = VOTE_MODELS[model_name]
+    with transaction.atomic():
+        posts = model.objects.filter(id__gte=low, id__lt=high)
+        if not dry_run:
+            posts = posts.select_for_update()
+        checked, mismatched = _score_mismatches(
+            model, posts, object_id__gte=low, object_id__lt=high
+        )
+        pending = [] if dry_run else mismatched
+        while pending:
+            moved = [
+                post_id for post_id, score, expected in pending
+                if not model.objects.filter(id=post_id, score=score).update(
+                    score=expected
+                )
+            ]
+            pending = _score_mismatches(
+                model, model.objects.filter(id__in=moved), object_id__in=moved
+            )[1]
+    drifts = [abs(score - expected) for post_id, score, expected in mismatched]
+    return ScoreDrift(
+        checked, len(mismatched), sum(drifts), max(drifts, default=0)
+    )
@@ -34,9 +34,15 @@ posts_patterns = ([
 ], "posts")
 
 posts_api_patterns = ([
-    path("<int:id>/", posts_api.UserVoteEndpoint.as_view(), name="posts")
+    path("<int:id>/", posts_api.UserVoteEndpoint.as_view(), name="posts"),
+    path("<int:id>/views/", posts_api.QuestionViewHistoryEndpoint.as_view(), name="views"),
+    path("votes/", posts_api.BatchVoteEndpoint.as_view(), name="votes")
 ], "posts")
 
+tags_api_patterns = ([
+    path("complete", posts_api.TagCompletionEndpoint.as_view(), name="complete")
+], "tags")
+
 authors_patterns =  ([
     path("signup/", av.RegisterNewUserPage.as_view(), name="register"),
     path("login/", av.LoginUserPage.as_view(), name="login"),
@@ -53,4 +59,5 @@ urlpatterns = [
     path("", include(posts_patterns, namespace="posts")),
     path("api/v1/users/", include(authors_api_patterns), name="authors_api"),
     path("api/v1/posts/", include(posts_api_patterns, namespace="api_posts")),
+    path("api/v1/tags/", include(tags_api_patterns, namespace="api_tags")),
 ]
@@ -1,26 +1,75 @@
 
-
 let search_widget = document.getElementById("id_q");
 let page_footer = document.querySelector(".page_footer");
+let tag_completions = document.querySelector(".tag_completions");
+const complete_url = document.currentScript.dataset.completeUrl;
+const TAG_PREFIX = /\[([^\[\]\s]*)$/;
+var completion_request = null;
 
 window.addEventListener("load", function(event) {
+  if (!page_footer) {
+    return;
+  }
   const page_footer_box_height = page_footer.getBoundingClientRect().height;
   page_footer.style.height = `${page_footer_box_height + 75}px`;
 
 })
 
-search_widget.addEventListener("focus", function(event) {
-  const search_tips = document.querySelector(".query_help_tips");
-  search_tips.classList.toggle("hide");
-})
+function complete_tag(name) {
+  search_widget.value = search_widget.value.replace(TAG_PREFIX, `[${name}] `);
+  tag_completions.classList.add("hide");
+}
 
-search_widget.addEventListener("blur", function(event) {
-  const search_tips = document.querySelector(".query_help_tips");
-  search_tips.classList.toggle("hide");
-})
+// Pages without the search form, such as the login page, skip these.
+if (search_widget) {
+  search_widget.addEventListener("focus", function(event) {
+    const search_tips = document.querySelector(".query_help_tips");
+    search_tips.classList.toggle("hide");
+  })
 
-search_widget.addEventListener("keyup", function(event) {
-  if (event.key === "Enter" && this.value) {
-    //pass
-  }
-})
+  search_widget.addEventListener("blur", function(event) {
+    const search_tips = document.querySelector(".query_help_tips");
+    search_tips.classList.toggle("hide");
+    tag_completions.classList.add("hide");
+  })
+
+  search_widget.addEventListener("input", function(event) {
+    const match = TAG_PREFIX.exec(this.value);
+    if (completion_request) {
+      completion_request.abort();
+      completion_request = null;
+    }
+    if (!match) {
+      tag_completions.classList.add("hide");
+      return;
+    }
+    completion_request = new AbortController();
+    const params = new URLSearchParams({"prefix": match[1], "limit": 8});
+    fetch(`${complete_url}?${params}`, {
+      "signal": completion_request.signal
+    }).then((response) => response.json()).then((tags) => {
+      tag_completions.replaceChildren(...tags.map((tag) => {
+        const item = document.createElement("li");
+        const count = document.createElement("span");
+        item.className = "search_tip";
+        item.textContent = `${tag.name} `;
+        count.className = "tip_style";
+        count.textContent = `${tag.questions} questions`;
+        item.append(count);
+        // mousedown fires before the widget blurs and hides the list.
+        item.addEventListener("mousedown", (e) => {
+          e.preventDefault();
+          complete_tag(tag.name);
+        });
+        return item;
+      }));
+      tag_completions.classList.toggle("hide", tags.length === 0);
+    }).catch(() => {});
+  })
+
+  search_widget.addEventListener("keyup", function(event) {
+    if (event.key === "Enter" && this.value) {
+      //pass
+    }
+  })
+}